@@ -0,0 +1,82 @@
+import pandas as pd
+import numpy as np
+from collections import namedtuple
+
+# Sum of `columns` over the rows whose order type is in `order_types` (every row when None).
+# Several columns are added row by row first, like (df['a'] + df['b']).sum().
+Total = namedtuple('Total', ['columns', 'order_types'])
+
+# Number of distinct dates on which any of `columns` is positive
+Days = namedtuple('Days', ['columns'])
+
+def total(columns, order_types=None):
+    columns = (columns,) if isinstance(columns, str) else tuple(columns)
+    return Total(columns, tuple(order_types) if order_types is not None else None)
+
+def days(*columns):
+    return Days(columns)
+
+def _values(df, columns):
+    values = df[columns[0]]
+    for column in columns[1:]:
+        values = values + df[column]
+    return values
+
+def aggregate(df, measures):
+    # measures: (label, Total or Days) pairs, in the order the labels are displayed.
+    # The order type column is factorized once, every numeric total is summed per order type
+    # in a single groupby and each bucket then adds up the few order types it covers.
+    totals = [measure for _, measure in measures if isinstance(measure, Total)]
+    values = {}
+    for measure in totals:
+        if measure.columns not in values:
+            values[measure.columns] = _values(df, measure.columns)
+    numeric = [key for key, series in values.items() if pd.api.types.is_numeric_dtype(series)]
+
+    if any(measure.order_types is not None for measure in totals):
+        codes, order_types = pd.factorize(df['order type'])
+        # Rows without an order type (code -1) belong to no bucket
+        group_of_row = np.where(codes < 0, len(order_types), codes)
+        order_types = pd.Index(order_types, dtype=object)
+    else:
+        group_of_row = np.zeros(len(df), dtype=np.intp)
+        order_types = pd.Index([], dtype=object)
+    numeric_index = {key: i for i, key in enumerate(numeric)}
+    if numeric:
+        per_group = pd.DataFrame({i: values[key].to_numpy() for i, key in enumerate(numeric)}).groupby(group_of_row).sum()
+
+    buckets = {}
+    def bucket(keys):
+        if keys not in buckets:
+            buckets[keys] = np.append(order_types.isin(keys), False)
+        return buckets[keys]
+
+    aggregated_data = {}
+    for label, measure in measures:
+        if isinstance(measure, Days):
+            valid = df[measure.columns[0]] > 0
+            for column in measure.columns[1:]:
+                valid = valid | (df[column] > 0)
+            aggregated_data[label] = df['date'][valid].nunique()
+        elif measure.columns in numeric_index:
+            sums = per_group[numeric_index[measure.columns]]
+            if measure.order_types is not None:
+                sums = sums[bucket(measure.order_types)[sums.index]]
+            aggregated_data[label] = sums.sum()
+        else:
+            # Text columns keep pandas' object sum semantics
+            series = values[measure.columns]
+            if measure.order_types is not None:
+                series = series[bucket(measure.order_types)[group_of_row]]
+            aggregated_data[label] = series.sum()
+    return aggregated_data
+
+PIVOT_KEYS = ['site name', 'vendor', 'session', 'meal type', 'order type']
+AVERAGE_PRICES = {'average_buying_price_ai': 'buying price ai', 'average_selling_price': 'selling price'}
+
+def summarize_prices(df, keys=PIVOT_KEYS, prices=AVERAGE_PRICES):
+    # Number of rows ('days') and the mean of each price column per group, in one grouped
+    # aggregation. Groups come out sorted by key, as they did from pivot_table.
+    aggregations = {'days': (keys[0], 'size')}
+    aggregations.update({name: (column, 'mean') for name, column in prices.items()})
+    return df.groupby(keys, observed=True).agg(**aggregations).reset_index()
@@ -0,0 +1,88 @@
+import pandas as pd
+import argparse
+import hashlib
+import logging
+import os
+import sys
+from batch_audit import available_cores, audit_workbook, create_pool
+from workbook_loader import SheetCache, Workbook
+
+# Headless audits for scripts and cron jobs, e.g.
+#   python audit_cli.py /data/mis/2024-05 --month may --format parquet --output-dir /data/audits
+# For every workbook, <output dir>/<workbook name>/ gets summary, average_prices, mismatches,
+# the issue lists, karbon_expenses and aggregated_values files, each tagged with the sheet and month.
+
+logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+
+def find_workbooks(paths):
+    workbooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            workbooks.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                # Skip Excel's lock files for workbooks that are open
+                if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$')
+            ))
+        else:
+            workbooks.append(path)
+    return workbooks
+
+def _parquet_safe(df):
+    # Columns mixing text with numbers (e.g. 'na' typed into a price) have no Parquet type
+    for column in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[column], skipna=True) not in ('string', 'empty'):
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+    return df
+
+def write_table(df, path, output_format):
+    if output_format == 'csv':
+        df.to_csv(f'{path}.csv', index=False)
+    elif output_format == 'parquet':
+        _parquet_safe(df.copy()).to_parquet(f'{path}.parquet', index=False)
+    else:
+        df.to_json(f'{path}.json', orient='records', date_format='iso', indent=1)
+
+def audit_file(path, pool, sheets=None, months=None, cache=None):
+    with open(path, 'rb') as f:
+        file_bytes = f.read()
+    workbook = Workbook(file_bytes, file_hash=hashlib.sha256(file_bytes).hexdigest(), cache=cache)
+    sheet_names = [name for name in workbook.sheet_names if sheets is None or name in sheets]
+    return audit_workbook(sheet_names, workbook.read_sheet, pool, months=months, with_reports=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Audit MIS workbooks without the Streamlit app.')
+    parser.add_argument('paths', nargs='+', help='Workbooks, or folders of workbooks')
+    parser.add_argument('--sheet', action='append', help='Only audit this sheet (repeatable)')
+    parser.add_argument('--month', action='append', help='Only audit this month, e.g. may (repeatable)')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'json'], default='csv')
+    parser.add_argument('--output-dir', default='audit_output')
+    parser.add_argument('--workers', type=int, default=available_cores())
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the decoded sheet cache')
+    args = parser.parse_args(argv)
+
+    # Months are matched after normalization, like the values in the sheets
+    months = [month.lower().strip() for month in args.month] if args.month else None
+    cache = None if args.no_cache else SheetCache()
+    failed = False
+    with create_pool(args.workers) as pool:
+        for path in find_workbooks(args.paths):
+            try:
+                summary_df, reports = audit_file(path, pool, args.sheet, months, cache)
+            except Exception as e:
+                logging.error(f"Error reading the workbook '{path}': {e}")
+                failed = True
+                continue
+            output_dir = os.path.join(args.output_dir, os.path.splitext(os.path.basename(path))[0])
+            os.makedirs(output_dir, exist_ok=True)
+            write_table(summary_df, os.path.join(output_dir, 'summary'), args.format)
+            for name, df in reports.items():
+                write_table(df, os.path.join(output_dir, name), args.format)
+            if 'Error' in summary_df.columns and summary_df['Error'].notna().any():
+                failed = True
+            logging.info(f"Audited {summary_df['Sheet'].nunique() if len(summary_df) else 0} sheets of '{path}' into '{output_dir}'.")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
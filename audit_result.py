@@ -0,0 +1,13 @@
+import pandas as pd
+from collections import namedtuple
+
+# What a business/event logic computes for one sheet and month. It holds only DataFrames, dicts
+# and numbers, so it pickles cheaply between processes and is rendered by the app, written out
+# by the CLI or summarized by the batch audit.
+#   average_prices: prices per group, or None for logics without that table
+#   reports: report name -> DataFrame of the rows found, in display order (mismatches first)
+#   aggregates: label -> value, in display order
+AuditResult = namedtuple('AuditResult', ['average_prices', 'reports', 'aggregates'])
+
+def aggregates_frame(aggregates):
+    return pd.DataFrame(list(aggregates.items()), columns=['Parameter', 'Value'])
@@ -0,0 +1,197 @@
+import pandas as pd
+import os
+import logging
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from normalization import drop_unused_categories, normalize_sheet
+from sheet_registry import find_business_logic
+from audit_result import aggregates_frame
+
+ISSUE_LABELS = {
+    'mismatches': 'Mismatches',
+    'buying_value_issues': 'Buying Value Issues',
+    'selling_value_issues': 'Selling Value Issues',
+    'popup_selling_issues': 'Popup Selling Issues',
+    'karbon_expenses': 'Karbon Expenses',
+    'pax_in_bf_snacks': 'Pax in BF & Snacks',
+    'missing_pax_in_lunch': 'Missing Pax in Lunch',
+    'row_errors': 'Rows With Errors'
+}
+
+# A report counts its rows, except row_errors: it has one row per rule a sheet row failed
+ISSUE_COUNTS = {'row_errors': lambda report_df: report_df['Row'].nunique()}
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Error recorded for a sheet whose worker died twice, e.g. killed for running out of memory
+WORKER_DIED = "The worker process auditing this sheet stopped unexpectedly."
+
+class AuditPool:
+    # Worker processes for audit_sheet. A worker dying breaks a ProcessPoolExecutor for good, so
+    # the pool swaps in a fresh executor when that happens. `generation` counts the swaps; a caller
+    # passes the generation its futures came from, so a pool shared between sessions is only
+    # restarted once per breakdown.
+    def __init__(self, workers=None):
+        self.workers = workers or available_cores()
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._executor = self._create()
+
+    def _create(self):
+        # Workers are spawned rather than forked: the Streamlit server is multithreaded
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def restart(self, generation):
+        with self._lock:
+            if generation != self.generation:
+                return
+            logging.warning("An audit worker stopped unexpectedly, restarting the worker processes.")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create()
+            self.generation += 1
+
+    def submit(self, function, *args):
+        # Returns the future and the generation it was submitted to
+        for attempt in range(2):
+            with self._lock:
+                executor, generation = self._executor, self.generation
+            try:
+                return executor.submit(function, *args), generation
+            except BrokenProcessPool:
+                if attempt:
+                    raise
+                self.restart(generation)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+def create_pool(workers=None):
+    return AuditPool(workers)
+
+def workers_died(summary_df):
+    return 'Error' in summary_df.columns and summary_df['Error'].eq(WORKER_DIED).any()
+
+def _groups(df, module):
+    # (labels, rows) for every month in the sheet. Logics with SELECT_BY are audited for every
+    # value of that column within the month, recorded as the 'Selection'.
+    select_by = getattr(module, 'SELECT_BY', None)
+    keys = ['month', select_by] if select_by else ['month']
+    for values, rows in df.groupby(keys, observed=True, sort=False):
+        labels = {'Month': values[0]}
+        if select_by:
+            labels['Selection'] = values[1]
+        yield labels, rows
+
+def audit_sheet(sheet_name, module_name, df, months=None, with_reports=False):
+    # Runs in a worker process. Returns one summary row per month audited and, when asked,
+    # every report and the aggregated values, tagged with the sheet and month.
+    summaries = []
+    reports = {}
+    try:
+        module = importlib.import_module(module_name)
+        business_logic_function = getattr(module, module_name)
+        df = normalize_sheet(df)
+        if 'month' not in df.columns:
+            raise KeyError("No 'month' column found in this sheet.")
+        if months is not None:
+            df = df[df['month'].isin(months)]
+        for labels, rows in _groups(df, module):
+            result = business_logic_function(drop_unused_categories(rows.copy()))
+            tags = {'Sheet': sheet_name, **labels}
+
+            summary = {'Sheet': sheet_name, 'Logic': module_name, **labels, 'Rows': len(rows)}
+            for name, report_df in result.reports.items():
+                summary[ISSUE_LABELS.get(name, name)] = ISSUE_COUNTS.get(name, len)(report_df)
+            summary.update(result.aggregates)
+            summaries.append(summary)
+
+            if with_reports:
+                tables = dict(result.reports, aggregated_values=aggregates_frame(result.aggregates))
+                if result.average_prices is not None:
+                    tables['average_prices'] = result.average_prices
+                for name, table in tables.items():
+                    reports.setdefault(name, []).append(table.assign(**tags)[[*tags, *table.columns]])
+    except Exception as e:
+        logging.error(f"Error auditing the sheet '{sheet_name}': {e}")
+        summaries.append({'Sheet': sheet_name, 'Logic': module_name, 'Error': str(e)})
+    return summaries, {name: pd.concat(tables, ignore_index=True) for name, tables in reports.items()}
+
+def _tagged_first(df):
+    tags = [column for column in ['Sheet', 'Month', 'Selection'] if column in df.columns]
+    return df[tags + [column for column in df.columns if column not in tags]]
+
+def _submit_sheets(sheets, read_sheet, pool, months, with_reports):
+    # (sheet name, logic, future and its pool generation, or the error reading the sheet)
+    pending = []
+    for sheet_name, module_name in sheets:
+        try:
+            df = read_sheet(sheet_name)
+        except Exception as e:
+            logging.error(f"Error reading the sheet '{sheet_name}': {e}")
+            pending.append((sheet_name, module_name, e))
+            continue
+        try:
+            submitted = pool.submit(audit_sheet, sheet_name, module_name, df, months, with_reports)
+        except BrokenProcessPool:
+            submitted = BrokenProcessPool(WORKER_DIED)
+        pending.append((sheet_name, module_name, submitted))
+    return pending
+
+def audit_workbook(sheet_names, read_sheet, pool, months=None, with_reports=False):
+    # Every sheet with a business logic is read once here and audited in the pool.
+    # Sheets are submitted as soon as they are read, so parsing overlaps with the audits.
+    # Sheets lost to a dead worker are read and audited once more in a restarted pool; if that
+    # fails too they get the WORKER_DIED error.
+    # Returns the summary table and, with with_reports, one table per report.
+    sheets = [(sheet_name, find_business_logic(sheet_name)) for sheet_name in sheet_names]
+    sheets = [(sheet_name, module_name) for sheet_name, module_name in sheets if module_name is not None]
+    results = {}
+    for retry in (False, True):
+        lost = []
+        for sheet_name, module_name, submitted in _submit_sheets(sheets, read_sheet, pool, months, with_reports):
+            try:
+                if isinstance(submitted, Exception):
+                    raise submitted
+                future, generation = submitted
+                results[sheet_name] = future.result()
+            except BrokenProcessPool:
+                if not retry and not isinstance(submitted, Exception):
+                    pool.restart(generation)
+                lost.append((sheet_name, module_name))
+                results[sheet_name] = {'Sheet': sheet_name, 'Logic': module_name, 'Error': WORKER_DIED}
+            except Exception as e:
+                # Read errors, and other failures to return a result
+                results[sheet_name] = {'Sheet': sheet_name, 'Logic': module_name, 'Error': str(e)}
+        if not lost:
+            break
+        sheets = lost
+
+    summaries = []
+    reports = {}
+    for result in results.values():
+        if isinstance(result, dict):
+            summaries.append(result)
+            continue
+        sheet_summaries, sheet_reports = result
+        summaries.extend(sheet_summaries)
+        for name, table in sheet_reports.items():
+            reports.setdefault(name, []).append(table)
+
+    # Issue counts first, then the aggregates of every module in the order they were met
+    summary_df = pd.DataFrame(summaries)
+    leading = [column for column in ['Sheet', 'Logic', 'Month', 'Selection', 'Error', 'Rows', *ISSUE_LABELS.values()] if column in summary_df.columns]
+    summary_df = summary_df[leading + [column for column in summary_df.columns if column not in leading]]
+    return summary_df, {name: _tagged_first(pd.concat(tables, ignore_index=True)) for name, tables in reports.items()}
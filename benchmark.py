@@ -0,0 +1,287 @@
+import pandas as pd
+import numpy as np
+import argparse
+import datetime
+import glob
+import importlib
+import io
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from aggregation import PIVOT_KEYS, Total
+from audit_result import aggregates_frame
+from issue_reports import KARBON_COLUMNS
+from mismatch_engine import COUNT_KEYWORDS, run_plan
+from normalization import drop_unused_categories, month_index, normalize_sheet
+from presentation import PAGE_ROWS, number_column_config
+from workbook_loader import SheetCache, Workbook, reader_engines
+
+# Synthetic MIS sheets shaped like the real ones: a title row, then the header row (header=1)
+def make_sheet(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    gst = rng.choice([1.05, 1.18], rows)
+    buying_price = rng.integers(40, 120, rows).astype(float)
+    buying_pax = rng.integers(0, 400, rows)
+    selling_price = buying_price + rng.integers(0, 30, rows)
+    return pd.DataFrame({
+        'date': pd.Timestamp('2024-05-01') + pd.to_timedelta(rng.integers(0, 31, rows), unit='D'),
+        'month': 'may',
+        'site name': rng.choice(['Postman', 'MPL', 'Tekion'], rows),
+        'vendor': rng.choice(['Vendor A', 'Vendor B', 'Vendor C'], rows),
+        'session': rng.choice(['Breakfast', 'Lunch-Veg', 'Lunch-Non Veg', 'Snacks', 'Dinner'], rows),
+        'meal type': rng.choice(['Buffet', 'Packed', 'Saladbar'], rows),
+        'order type': rng.choice(['Regular', 'Adhoc', 'Food Trial', 'Event'], rows),
+        'buying price ai': buying_price,
+        'gst': gst,
+        'buying price': buying_price / gst,
+        'buying pax': buying_pax,
+        'buying transportation': 0,
+        'buying amt ai': buying_price * buying_pax,
+        'selling price': selling_price,
+        'selling pax': buying_pax,
+        'selling transportation': 0,
+        'selling amount': selling_price * buying_pax,
+        'penalty on vendor': 0,
+        'penalty on smartq': 0,
+        'commission': (selling_price - buying_price) * buying_pax,
+        'remarks': rng.choice(['', 'checked', 'late delivery'], rows)
+    })
+
+def make_workbook(rows, sheets=1, make=make_sheet):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for i in range(sheets):
+            sheet = make(rows, seed=i)
+            sheet.to_excel(writer, sheet_name=f'Sheet{i + 1}', index=False, startrow=1)
+            writer.sheets[f'Sheet{i + 1}'].cell(row=1, column=1, value='Monthly MIS')
+    return buffer.getvalue()
+
+def bench_readers(file_bytes, repeat=3):
+    results = {}
+    engines = reader_engines(file_bytes)
+    # Always time the pure-Python fallback as the baseline
+    for engine in dict.fromkeys(engines + ['openpyxl']):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            workbook = Workbook(file_bytes, engines=[engine])
+            df = workbook.read_sheet(workbook.sheet_names[0])
+            timings.append(time.perf_counter() - start)
+        results[engine] = (min(timings), df)
+    return results
+
+# Per-logic sheets. The schema comes from the logic itself: every column its rules read or
+# compare, its reports project and its aggregates sum. Pivot columns beyond the standard keys
+# are listed here.
+PIVOT_COLUMNS = {
+    'business_logic_16': ['menu item'],
+    'business_logic_20': ['rate'],
+    'business_logic_24': ['whole fruits', 'unit price'],
+    'event_logic_5': ['menu  item']
+}
+PRICE_COLUMNS = ['rate', 'unit price']
+DATE_COLUMNS = ['date', 'date(karbon)']
+KARBON_NUMBERS = ['price', 'pax', 'amount']
+# Share of rows with a Karbon expense, and of checked cells typed in wrong
+KARBON_RATE = 0.03
+ERROR_RATE = 0.01
+
+def logic_modules():
+    return sorted(os.path.basename(path)[:-3] for path in glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*_logic_*.py')))
+
+def logic_schema(module_name):
+    # column -> list of text choices, 'number' or 'date'. The month is set from the date.
+    module = importlib.import_module(module_name)
+    plan = module.AUDIT_PLAN
+    schema = {'date': 'date'}
+    for column in PIVOT_KEYS + PIVOT_COLUMNS.get(module_name, []):
+        schema[column] = 'number' if column in PRICE_COLUMNS else []
+    for op, params, _ in plan.nodes:
+        if op in ('text_in', 'tier'):
+            column, choices = params
+            if op == 'tier':
+                choices = [key for key, _, _ in choices]
+            if not isinstance(schema.get(column), list):
+                schema[column] = []
+            schema[column] += [choice for choice in choices if isinstance(choice, str) and choice not in schema[column]]
+        elif op in ('col', 'filled', 'blank'):
+            schema.setdefault(params, 'number')
+    for _, measure in module.AGGREGATES:
+        for column in measure.columns:
+            schema.setdefault(column, 'number')
+        # Rows of every order type the totals are bucketed by, not only the pop-up ones
+        if isinstance(measure, Total) and measure.order_types:
+            schema['order type'] += [choice for choice in measure.order_types if choice not in schema['order type']]
+    for _, _, columns in plan.reports:
+        for _, column in columns:
+            if column in DATE_COLUMNS:
+                schema.setdefault(column, 'date')
+            else:
+                schema.setdefault(column, 'number' if column in KARBON_NUMBERS else [])
+    return schema
+
+def _numbers(rng, column, rows):
+    if column == 'gst':
+        return rng.choice([1.05, 1.18], rows)
+    if '%' in column:
+        return rng.choice([0.05, 0.1, 0.15], rows)
+    if any(keyword in column for keyword in COUNT_KEYWORDS):
+        return rng.integers(0, 400, rows).astype(float)
+    return rng.integers(4000, 20000, rows) / 100
+
+def make_logic_sheet(module_name, rows, seed=0):
+    # Rows follow the logic's formulas, except ERROR_RATE of the checked cells; text cells get
+    # the odd capitalisation and padding that normalization has to undo
+    rng = np.random.default_rng(seed)
+    plan = importlib.import_module(module_name).AUDIT_PLAN
+    checked_by_rules = {params for op, params, _ in plan.nodes if op == 'col'}
+    karbon_rows = rng.random(rows) < KARBON_RATE
+    data = {}
+    for column, kind in logic_schema(module_name).items():
+        if kind == 'date':
+            data[column] = pd.Timestamp('2024-05-01') + pd.to_timedelta(rng.integers(0, 61, rows), unit='D')
+        elif kind == 'number':
+            data[column] = _numbers(rng, column, rows)
+        else:
+            choices = [choice.lower() for choice in kind] or [f'{column} {i}' for i in range(1, 4)]
+            data[column] = rng.choice(choices, rows).astype(object)
+        if column in KARBON_COLUMNS and column not in checked_by_rules:
+            data[column] = pd.Series(data[column]).where(karbon_rows)
+    df = pd.DataFrame(data)
+    df.insert(1, 'month', np.where(df['date'] < pd.Timestamp('2024-06-01'), 'may', 'june'))
+
+    # A few passes settle checks whose inputs are themselves checked columns
+    checked = [step[1] for step in plan.steps if step[0] == 'check']
+    for _ in range(4):
+        mismatched_df = run_plan(df, plan)['mismatches']
+        mismatched_df = mismatched_df[pd.to_numeric(mismatched_df['Expected'], errors='coerce').notna()]
+        if mismatched_df.empty:
+            break
+        for column, group in mismatched_df.groupby('Column'):
+            df.loc[group['Row'].to_numpy() - 3, column] = group['Expected'].astype(float).to_numpy()
+    for column in dict.fromkeys(checked):
+        wrong = rng.random(rows) < ERROR_RATE
+        df.loc[wrong, column] = df.loc[wrong, column] + rng.integers(1, 50, wrong.sum())
+
+    for column in df.columns[df.dtypes == object]:
+        decorated = rng.random(rows) < 0.3
+        df.loc[decorated, column] = ' ' + df.loc[decorated, column].str.title() + ' '
+    df.columns = [column.title() if rng.random() < 0.5 else column for column in df.columns]
+    return df
+
+def prepare_render(result):
+    # What render_result computes before handing tables to Streamlit
+    tables = list(result.reports.values()) + [aggregates_frame(result.aggregates)]
+    if result.average_prices is not None:
+        tables.append(result.average_prices)
+    for table in tables:
+        number_column_config(table)
+        table.iloc[:PAGE_ROWS]
+
+def _best(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), value
+
+def bench_stages(module_name, rows, repeat=3, excel=False):
+    module = importlib.import_module(module_name)
+    raw = make_logic_sheet(module_name, rows)
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SheetCache(directory)
+        cache.write('bench', 0, raw)
+        timings['load (cached)'], loaded = _best(lambda: cache.read('bench', 0), repeat)
+    if excel:
+        file_bytes = make_workbook(rows, make=lambda rows, seed: raw)
+        timings['load (excel)'], _ = _best(lambda: Workbook(file_bytes).read_sheet('Sheet1'), 1)
+    timings['normalize'], df = _best(lambda: normalize_sheet(loaded.copy()), repeat)
+    months = month_index(df)
+    month = next(iter(months))
+    timings['month filter'], df_month = _best(lambda: drop_unused_categories(df.take(months[month])), repeat)
+
+    timings['mismatches'], _ = _best(lambda: module.find_issues(df_month), repeat)
+    timings['aggregates'], _ = _best(lambda: module.calculate_aggregated_values(df_month), repeat)
+    if hasattr(module, 'pivot_and_average_prices'):
+        timings['pivots'], _ = _best(lambda: module.pivot_and_average_prices(df_month), repeat)
+    result = getattr(module, module_name)(df_month)
+    timings['render prep'], _ = _best(lambda: prepare_render(result), repeat)
+    return timings
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_records(path):
+    # Fastest recorded time per (rows, module, stage)
+    best = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record['rows'], record['module'], record['stage'])
+            best[key] = min(best.get(key, float('inf')), record['seconds'])
+    return best
+
+def run_readers(args):
+    for rows in args.rows:
+        file_bytes = make_workbook(rows)
+        results = bench_readers(file_bytes, args.repeat)
+        baseline, expected = results['openpyxl']
+        for engine, (seconds, df) in results.items():
+            pd.testing.assert_frame_equal(df, expected)
+            print(f"{rows:>7} rows  {engine:<9} {seconds:8.3f} s  {baseline / seconds:5.1f}x")
+
+def run_stages(args):
+    # Every audit logs its row error summary; left on, those lines would bury the timings
+    logging.getLogger().setLevel(logging.CRITICAL)
+    baseline = load_records(args.compare) if args.compare else {}
+    commit = current_commit()
+    started = datetime.datetime.now().isoformat(timespec='seconds')
+    records = []
+    for rows in args.rows:
+        for module_name in args.modules or logic_modules():
+            for stage, seconds in bench_stages(module_name, rows, args.repeat, args.excel).items():
+                record = {'commit': commit, 'started': started, 'rows': rows, 'module': module_name, 'stage': stage, 'seconds': seconds}
+                records.append(record)
+                line = f"{rows:>8} rows  {module_name:<18} {stage:<14} {seconds:9.4f} s"
+                previous = baseline.get((rows, module_name, stage))
+                if previous:
+                    line += f"  {previous / seconds:5.2f}x vs baseline"
+                print(line, flush=True)
+    if args.record:
+        with open(args.record, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks on synthetic MIS workbooks.')
+    commands = parser.add_subparsers(dest='command')
+    readers = commands.add_parser('readers', help='Time the Excel reader engines')
+    readers.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 60000])
+    readers.add_argument('--repeat', type=int, default=3)
+    stages = commands.add_parser('stages', help='Time every stage of each logic on sheets following its schema')
+    stages.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    stages.add_argument('--modules', nargs='+', help='Logic modules to run (default: all)')
+    stages.add_argument('--repeat', type=int, default=3)
+    stages.add_argument('--excel', action='store_true', help='Also time a cold read from .xlsx (slow to generate)')
+    stages.add_argument('--record', help='Append the timings as JSON lines to this file')
+    stages.add_argument('--compare', help='Show speedups against the timings recorded in this file')
+    args = parser.parse_args()
+
+    if args.command == 'stages':
+        run_stages(args)
+    else:
+        if args.command is None:
+            args = readers.parse_args([])
+        run_readers(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import pandas as pd
+from collections import namedtuple
+from audit_result import AuditResult
+from stage_profiler import stage
+
+# Reviewers correct a few cells and upload the same MIS again. Every check and issue report works
+# row by row, so after a re-upload only the rows whose contents changed are checked again; the
+# findings of the other rows are carried over. The average prices and aggregated values span the
+# whole month and are recomputed, which is a few grouped sums.
+#   columns: the sheet's columns; any change to them means a full audit
+#   hashes: a content hash per row, indexed like the sheet
+#   reports: the previous report tables
+AuditState = namedtuple('AuditState', ['columns', 'hashes', 'reports'])
+
+def row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=True)
+
+def _changed_rows(hashes, previous):
+    unchanged = hashes.eq(previous.hashes.reindex(hashes.index)).to_numpy()
+    return hashes.index[unchanged], hashes.index[~unchanged]
+
+def _patch(previous_df, kept_rows, new_df):
+    # Report rows are in sheet order, and the 'Row' column (index + 3) gives that order
+    kept_df = previous_df[previous_df['Row'].isin(kept_rows + 3)]
+    if new_df.empty:
+        return kept_df.reset_index(drop=True)
+    if kept_df.empty:
+        return new_df.reset_index(drop=True)
+    return pd.concat([kept_df, new_df], ignore_index=True).sort_values('Row', kind='stable', ignore_index=True)
+
+def reaudit(module, df, previous=None):
+    # Returns the AuditResult for df and the state to pass in next time
+    with stage('row_hashes'):
+        hashes = row_hashes(df)
+    columns = tuple(df.columns)
+    incremental = (previous is not None and previous.columns == columns
+                   and df.index.is_unique and df.index.is_monotonic_increasing)
+    if incremental:
+        kept_rows, changed_rows = _changed_rows(hashes, previous)
+        with stage(f'find_issues ({len(changed_rows)} changed rows)'):
+            issues = module.find_issues(df.loc[changed_rows])
+            issues = {name: _patch(previous.reports[name], kept_rows, rows) for name, rows in issues.items()}
+    else:
+        with stage('find_issues'):
+            issues = module.find_issues(df)
+
+    average_prices = None
+    if hasattr(module, 'pivot_and_average_prices'):
+        with stage('pivot_and_average_prices'):
+            average_prices = module.pivot_and_average_prices(df)
+    with stage('calculate_aggregated_values'):
+        aggregated_data = module.calculate_aggregated_values(df)
+    result = AuditResult(average_prices, issues, aggregated_data)
+    return result, AuditState(columns, hashes, issues)
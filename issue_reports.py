@@ -0,0 +1,58 @@
+import operator
+from functools import reduce
+from mismatch_engine import col, filled, report
+
+POPUP_ORDER_TYPES = ['smartq-pop-up', 'regular-pop-up', 'event pop-up']
+
+# Pax or price filled in but the amount left at zero
+def buying_value_report(pax='buying pax', price='buying price ai', amount='buying amt ai'):
+    return report(((col(pax) > 0) | (col(price) > 0)) & (col(amount) == 0), [
+        ('Date', 'date'),
+        ('Session', 'session'),
+        ('Mealtype', 'meal type'),
+        ('Ordertype', 'order type'),
+        ('Buying Pax', pax),
+        ('Buying Price AI', price),
+        ('Buying Amount AI', amount)
+    ])
+
+def selling_value_report(pax='selling pax', price='selling price', amount='selling amount'):
+    return report(((col(pax) > 0) | (col(price) > 0)) & (col(amount) == 0), [
+        ('Date', 'date'),
+        ('Session', 'session'),
+        ('Mealtype', 'meal type'),
+        ('Ordertype', 'order type'),
+        ('Selling Pax', pax),
+        ('Selling Price', price),
+        ('Selling Amount', amount)
+    ])
+
+# Pop-up orders are not billed to the client, so any selling amount on them is an issue
+def popup_selling_report(order_types=POPUP_ORDER_TYPES, pax='selling pax', price='selling price', amount='selling amount',
+                         with_pax_and_price=True):
+    columns = [('Date', 'date'), ('Session', 'session'), ('Order Type', 'order type')]
+    if with_pax_and_price:
+        columns += [('Selling Pax', pax), ('Selling Price', price)]
+    columns.append(('Selling Amount', amount))
+    return report(col('order type').isin(order_types) & (col(amount) > 0), columns)
+
+KARBON_COLUMNS = ['date(karbon)', 'expense item', 'reason for expense', 'expense type', 'price', 'pax', 'amount',
+                  'mode of payment', 'bill to', 'requested by', 'approved by']
+
+# Rows with any Karbon expense column filled in. Sheets missing some of these columns
+# still get the report, with those fields left blank.
+def karbon_expense_report():
+    return report(reduce(operator.or_, [filled(column) for column in KARBON_COLUMNS]), [
+        ('Buying Amount', 'buying amt ai'),
+        ('Date', 'date(karbon)'),
+        ('Expense Item', 'expense item'),
+        ('Reason for Expense', 'reason for expense'),
+        ('Expense Type', 'expense type'),
+        ('Price', 'price'),
+        ('Pax', 'pax'),
+        ('Amount', 'amount'),
+        ('Mode Of Payment', 'mode of payment'),
+        ('Bill to', 'bill to'),
+        ('Requested By', 'requested by'),
+        ('Approved By', 'approved by')
+    ])
@@ -1,11 +1,81 @@
-import pandas as pd
+import os
 import logging
 import streamlit as st
 import importlib
+import hashlib
+from workbook_loader import SheetCache, Workbook
+from normalization import drop_unused_categories, month_index, normalize_sheet
+from sheet_registry import find_business_logic
+from batch_audit import audit_workbook, create_pool, workers_died
+from presentation import render_result, show_stage_timings, show_table
+from incremental_audit import reaudit
+from stage_profiler import StageProfiler, activate, stage
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
+# Previous audits kept per session for incremental re-audits, least recently used dropped first
+MAX_AUDIT_STATES = 8
+
+# Whether the stage timings panel starts switched on
+PROFILE_STAGES = os.environ.get('MIS_PROFILE_STAGES') == '1'
+
+# Opened workbooks are cached by upload content hash, and their decoded sheets in the Parquet
+# sheet cache, so reruns triggered by changing the month or the sheet do not parse the .xlsx again
+@st.cache_resource
+def load_sheet_cache():
+    return SheetCache()
+
+@st.cache_resource(max_entries=4)
+def load_workbook(file_hash, _file_bytes):
+    return Workbook(_file_bytes, file_hash=file_hash, cache=load_sheet_cache())
+
+# The normalized sheet and its month index are kept as one shared object, so switching months
+# neither reloads, normalizes nor scans the sheet again. Month frames are taken from it, and the
+# shared frame is never modified. Only this normalized copy of a sheet is kept in memory.
+@st.cache_resource(max_entries=8)
+def load_indexed_sheet(file_hash, sheet_name, _file_bytes):
+    with stage('read'):
+        df = load_workbook(file_hash, _file_bytes).read_sheet(sheet_name)
+    with stage('normalize'):
+        df = normalize_sheet(df)
+    with stage('month index'):
+        return df, month_index(df) if 'month' in df.columns else None
+
+# Worker processes for the whole-workbook audit, started once and reused across reruns. The
+# pool restarts its workers itself when one of them dies.
+@st.cache_resource
+def load_process_pool():
+    return create_pool()
+
+@st.cache_data(max_entries=4)
+def run_batch_audit(file_hash, _file_bytes):
+    workbook = load_workbook(file_hash, _file_bytes)
+    summary_df, _ = audit_workbook(workbook.sheet_names, workbook.read_sheet, load_process_pool())
+    return summary_df
+
+def display_batch_audit(file_hash, file_bytes):
+    with st.spinner("Auditing every sheet..."), stage('batch audit'):
+        summary_df = run_batch_audit(file_hash, file_bytes)
+    if workers_died(summary_df):
+        # Not kept, so the sheets lost to dead workers are audited again on the next run
+        run_batch_audit.clear(file_hash, file_bytes)
+    logging.info(f"Batch audit finished for {summary_df['Sheet'].nunique() if len(summary_df) else 0} sheets.")
+    if summary_df.empty:
+        st.write("No sheet in this workbook has a business logic defined.")
+        return
+    if 'Error' in summary_df.columns:
+        failed = summary_df.loc[summary_df['Error'].notna(), 'Sheet']
+        if len(failed):
+            st.error(f"Could not audit: {', '.join(failed)}")
+    if 'Month' in summary_df.columns:
+        months = summary_df['Month'].dropna().unique()
+        month = st.sidebar.selectbox("Select the month for review", ['All months', *months])
+        if month != 'All months':
+            summary_df = summary_df[summary_df['Month'] == month]
+    st.subheader("Workbook Summary")
+    show_table(summary_df, 'workbook_summary')
+
 def main():
     st.set_page_config(page_title="Monthly MIS Checker", layout="wide")  # Set page title and layout
     st.title("MIS Reviewer 	:chart_with_upwards_trend:")
@@ -13,10 +83,21 @@ def main():
     # Allow user to upload an Excel file
     uploaded_file = st.sidebar.file_uploader('Upload Excel file', type=['xlsx', 'xls'])
 
+    # Optional breakdown of the time and memory each stage of this run took, also written to the log
+    profiler = None
+    if st.sidebar.checkbox('Show stage timings', value=PROFILE_STAGES):
+        panel = st.sidebar.expander('Stage timings', expanded=True).empty()
+        profiler = StageProfiler(on_stage=lambda profiler: show_stage_timings(panel, profiler.frame()))
+    activate(profiler)
+
     if uploaded_file:
         try:
             # The uploaded file is in memory as a file-like object
-            excel_file = pd.ExcelFile(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            with stage('open workbook'):
+                file_hash = hashlib.sha256(file_bytes).hexdigest()
+                workbook = load_workbook(file_hash, file_bytes)
+                sheet_names = workbook.sheet_names
             logging.info("Excel file uploaded successfully.")
         except ValueError as e:
             st.error(f"Error reading the Excel file: {e}")
@@ -27,15 +108,22 @@ def main():
             logging.error(f"Unexpected error reading the Excel file: {e}")
             return
 
-        # Get the list of sheet names
-        sheet_names = excel_file.sheet_names
+        if st.sidebar.radio('Review', ['Single sheet', 'All sheets']) == 'All sheets':
+            try:
+                display_batch_audit(file_hash, file_bytes)
+            except Exception as e:
+                st.error(f"Error auditing the workbook: {e}")
+                logging.error(f"Error auditing the workbook: {e}")
+            return
 
         # Allow the user to select a sheet to display
         selected_sheet = st.sidebar.selectbox('Select a sheet to display', sheet_names)
 
         try:
-            # Read the selected sheet into a dataframe, specifying header row
-            df = pd.read_excel(uploaded_file, sheet_name=selected_sheet, header=1, engine='openpyxl')
+            # Read the selected sheet, with its header row, lower case the column names and text
+            # cells (except the 'date' column) and index the rows of each month
+            with stage('load sheet'):
+                df, months = load_indexed_sheet(file_hash, selected_sheet, file_bytes)
             logging.info(f"Sheet '{selected_sheet}' loaded successfully.")
         except ValueError as e:
             st.error(f"ValueError reading the sheet '{selected_sheet}': {e}")
@@ -46,33 +134,20 @@ def main():
             logging.error(f"Unexpected error reading the sheet '{selected_sheet}': {e}")
             return
 
-        try:
-            # Convert all column names to lower case
-            df.columns = df.columns.str.lower().str.strip()
-
-            # Exclude the 'date' column from being converted to lower case
-            columns_to_convert = df.columns.difference(['date'])
-            df[columns_to_convert] = df[columns_to_convert].apply(
-                lambda col: col.str.lower().str.strip() if col.dtype == 'object' else col
-            )
-            logging.info("Columns converted to lower case successfully.")
-        except Exception as e:
-            st.error(f"Error processing the data: {e}")
-            logging.error(f"Error processing the data: {e}")
-            return
-
         # Check if 'month' column exists
-        if 'month' not in df.columns:
+        if months is None:
             st.write("No 'month' column found in this sheet.")
             logging.warning("No 'month' column found in the sheet.")
             return
 
         try:
             # Get user input for the month
-            month = st.sidebar.selectbox("Select the month for review", df['month'].unique())
+            month = st.sidebar.selectbox("Select the month for review", list(months),
+                                         format_func=lambda month: f"{month} ({len(months[month])} rows)")
 
-            # Filter the DataFrame for the specified month
-            df_filtered = df[df['month'] == month]
+            # Take the rows of the selected month
+            with stage('filter month'):
+                df_filtered = drop_unused_categories(df.take(months[month]))
             logging.info(f"Data filtered by month '{month}' successfully.")
         except KeyError as e:
             st.error(f"KeyError filtering data by month: {e}")
@@ -83,89 +158,31 @@ def main():
             logging.error(f"Unexpected error filtering data by month: {e}")
             return
 
-        # Define sheet name lists for each business logic
-        business_logic_sheets = {
-            "business_logic_1": ["Postman"],
-            "business_logic_2": ["Pratilipi"],
-            "business_logic_3": ["Quzizz","Synergy","Amadeus","Awfis"],
-            "business_logic_4": ["Medtrix","Odessa","MG Eli Lilly","Scaler-Prequin"],
-            "business_logic_5": ["Gojek","Microchip Main Meal"],
-            "business_logic_6": ["HD Works"],
-            "business_logic_7": ["MPL"],
-            "business_logic_8": ["Tonbo","Tadano Escorts","Siemens - Tuckshop","Dynasty","Citrix Driver's Lunch & Dinner","sharefile"],
-            "business_logic_9": ["Rippling","Tessolve"],
-            "business_logic_10": ["MPL -  Infinity Plates","Tekion.","Groww Koramangala","Groww VTP","Groww Mumbai","Ather Mumbai","Epam"],
-            "business_logic_11": ["Telstra MainMeal(Cash & Carry)"],
-            "business_logic_12": ["Eli Lilly Wallet", "Sheet1"], # get this clarified
-            "business_logic_13": ["Sinch","O9 Solutions"],
-            "business_logic_14": ["RAKUTEN-2","Clario"],
-            "business_logic_15": ["Waters Main Meal"], # used BL6 and might be same for seminens
-            "business_logic_16": ["Quest Company Paid"],
-            "business_logic_17": ["Waters Tuck Shop"],
-            "business_logic_18": ["H&M"],
-            "business_logic_19": ["Lam Research","Corning","PhonePe"],
-            "business_logic_20": ["Micochip Juice Junction"],
-            "business_logic_21": ["Ather BLR"],
-            "business_logic_22": ["Ather Plant 1.","Ather Plant 2.","SAEL Delhi","Gojek."],  #gojek is ncr
-            "business_logic_23": ["STRIPE MIS","TEA-Breakfast"],
-            "business_logic_24": ["FRUIT N JUICE MIS"],
-            "business_logic_25": ["Siemens","Toasttab","Gartner"],
-            "business_logic_26": ["DTCC Wallet"],
-            "business_logic_27": ["Siemens_Pune"],
-            "business_logic_28": ["CSG-Pune"],
-            "business_logic_29": ["Salesforce-GGN"],
-            "business_logic_30": ["Salesforce - Jaipur"],
-            "business_logic_31": ["Ather - Main Meal"],
-            "business_logic_32": ["Siemens."], # NCR
-            "business_logic_33": ["Postman.","Citrix-Tuckshop"],
-            "business_logic_34": ["Sinch Lunch"],
-            "business_logic_35": ["Sinch Dinner"],
-            "business_logic_36": ["STRYKER MIS - '2024"],
-            "business_logic_37": ["EGL"],
-            "business_logic_38": ["Truecaller"],
-            "business_logic_39": ["Sharefile Wallet"],
-            "business_logic_40": ["Gold Hill-Main Meal","Goldhill Juice Junction.","Healthineer International","Priteck - Main meal","Pritech park Juice junction"],
-            "business_logic_41": ["Siemens-BLR","Siemens Juice Counter"],
-            "business_logic_42": ["Heathineer Factory"],
-            "business_logic_43": ["Airtel Center","Airtel  Plot 5","Airtel NOC Non veg","Airtel international"],
-            "business_logic_44": ["Tekion"],
-            "business_logic_45": ["HD Works(HYD)"],
-            "business_logic_46": ["Airtel Noida"],
-            "business_logic_47": ["Airtel NOC"],
-            "business_logic_48": ["Airtel-Jaya"],
-            "business_logic_49": ["MIQ"],
-            "business_logic_50": ["MIQ MRP"],
-
-
-            "event_logic_1": ["Telstra Event.","Telstra Event","Events"],
-            "event_logic_2": ["Eli Lilly Event"],
-            "event_logic_3": ["Waters Event"],
-            "event_logic_4": ["Icon-event-Bangalore","Sinch Event sheet","infosys Event+ Additional Sales","Other Events.","Telstra Event sheet","MPL-Delhi","Grow event"],
-            "event_logic_5": ["Other Events"],
-            "event_logic_6": ["Lam Research Event"],
-            "event_logic_7": ["ICON CHN EVENT"],
-            "event_logic_8": ["other Event MIS"],
-            "event_logic_9": ["Amazon  PNQ Events -"],
-
-
-            "other_revenues": [""]
-            # Add more mappings as needed
-        }
-
         # Determine which business logic to apply based on the selected sheet name
-        business_logic_module = None
-        for module_name, sheets in business_logic_sheets.items():
-            if selected_sheet in sheets:
-                business_logic_module = module_name
-                break
+        business_logic_module = find_business_logic(selected_sheet)
 
         if business_logic_module:
             try:
                 # Dynamically import the business logic module
                 module = importlib.import_module(business_logic_module)
-                # Call the appropriate business logic function
-                business_logic_function = getattr(module, business_logic_module)
-                business_logic_function(df_filtered)
+                # Every logic module defines an entry function named after it
+                getattr(module, business_logic_module)
+                # Some logics review one value of a column at a time, e.g. one site of a shared sheet
+                select_by = getattr(module, 'SELECT_BY', None)
+                selected_value = None
+                if select_by:
+                    selected_value = st.sidebar.selectbox(f"Select {select_by.title()}", df_filtered[select_by].unique())
+                    with stage(f'filter {select_by}'):
+                        df_filtered = drop_unused_categories(df_filtered[df_filtered[select_by] == selected_value].copy())
+                # Re-uploads of a corrected workbook only re-check the rows that changed
+                audit_key = (selected_sheet, month, business_logic_module, selected_value)
+                audit_states = st.session_state.setdefault('audit_states', {})
+                with stage('audit'):
+                    result, audit_states[audit_key] = reaudit(module, df_filtered, audit_states.pop(audit_key, None))
+                while len(audit_states) > MAX_AUDIT_STATES:
+                    audit_states.pop(next(iter(audit_states)))
+                with stage('render'):
+                    render_result(result)
                 logging.info(f"Business logic '{business_logic_module}' applied successfully.")
             except ModuleNotFoundError:
                 st.error(f"Business logic module '{business_logic_module}' not found.")
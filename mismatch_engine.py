@@ -0,0 +1,460 @@
+import numpy as np
+import pandas as pd
+import logging
+from collections import namedtuple
+from functools import reduce
+from stage_profiler import stage
+
+# Formula rules are expressions over column names, e.g.
+#   check('buying price', col('buying price ai') / col('gst'))
+# Each sheet's rules are compiled once at import into a plan that evaluates every
+# distinct sub-expression a single time over whole columns.
+
+class Expr:
+    def __init__(self, op, args=(), params=()):
+        self.op = op
+        self.args = tuple(args)
+        self.params = params
+        self.key = (op, params) + tuple(arg.key for arg in self.args)
+
+    def __add__(self, other):
+        return Expr('add', [self, wrap(other)])
+
+    def __radd__(self, other):
+        return Expr('add', [wrap(other), self])
+
+    def __sub__(self, other):
+        return Expr('sub', [self, wrap(other)])
+
+    def __rsub__(self, other):
+        return Expr('sub', [wrap(other), self])
+
+    def __mul__(self, other):
+        return Expr('mul', [self, wrap(other)])
+
+    def __rmul__(self, other):
+        return Expr('mul', [wrap(other), self])
+
+    def __truediv__(self, other):
+        return Expr('div', [self, wrap(other)])
+
+    def __rtruediv__(self, other):
+        return Expr('div', [wrap(other), self])
+
+    def __lt__(self, other):
+        return Expr('lt', [self, wrap(other)])
+
+    def __le__(self, other):
+        return Expr('le', [self, wrap(other)])
+
+    def __gt__(self, other):
+        return Expr('gt', [self, wrap(other)])
+
+    def __ge__(self, other):
+        return Expr('ge', [self, wrap(other)])
+
+    def __eq__(self, other):
+        # Comparing a column with a string compares the raw cell text
+        if self.op == 'col' and isinstance(other, str):
+            return self.isin([other])
+        return Expr('eq', [self, wrap(other)])
+
+    def __and__(self, other):
+        return Expr('and', [self, wrap(other)])
+
+    def __or__(self, other):
+        return Expr('or', [self, wrap(other)])
+
+    def __invert__(self):
+        return Expr('not', [self])
+
+    __hash__ = None
+
+    def isin(self, values):
+        return Expr('text_in', params=(self.params, tuple(values)))
+
+def col(name):
+    return Expr('col', params=name)
+
+def filled(name):
+    # True where the raw cell holds anything other than blank or 0, text included
+    return Expr('filled', params=name)
+
+def blank(name):
+    # True where the raw cell is empty; every row of a missing column counts as empty
+    return Expr('blank', params=name)
+
+def wrap(value):
+    return value if isinstance(value, Expr) else Expr('const', params=value)
+
+def maximum(*values):
+    return Expr('max', [wrap(value) for value in values])
+
+def where(condition, if_true, if_false):
+    return Expr('where', [wrap(condition), wrap(if_true), wrap(if_false)])
+
+def select(conditions, choices, default=np.nan):
+    args = [wrap(c) for c in conditions] + [wrap(c) for c in choices] + [wrap(default)]
+    return Expr('select', args, params=len(conditions))
+
+def tiered(name, table, level=None):
+    # Looks each row up in `table`, (key, upper bounds, values) triples: the row's text in column
+    # `name` picks the key, and `level` the first bound it does not exceed. Bounds are ascending
+    # and the last one is usually inf. Rows whose key is not in the table get NaN.
+    table = tuple((key, tuple(bounds), tuple(values)) for key, bounds, values in table)
+    return Expr('tier', [] if level is None else [wrap(level)], params=(name, table))
+
+# How far a value may be from its formula and still match: absolute + relative * |expected|,
+# plus half a unit in the last place kept when `decimals` is set (so 84.75 matches 84.7458 at 2)
+Tolerance = namedtuple('Tolerance', ['absolute', 'relative', 'decimals'])
+
+def tolerance(absolute=0.0, relative=0.0, decimals=None):
+    return Tolerance(absolute, relative, decimals)
+
+EXACT = tolerance()
+
+# Checked columns hold either head counts or rupee values: counts must match as whole numbers,
+# money to the paisa. A check can pass its own tolerance instead.
+COUNT_KEYWORDS = ('pax', 'consumption')
+COUNT_TOLERANCE = tolerance(decimals=0)
+MONEY_TOLERANCE = tolerance(decimals=2)
+
+def default_tolerance(column):
+    if any(keyword in column.lower() for keyword in COUNT_KEYWORDS):
+        return COUNT_TOLERANCE
+    return MONEY_TOLERANCE
+
+# A formula check: `expected` is the value `column` should hold; `when` optionally limits the rows checked
+Check = namedtuple('Check', ['column', 'expected', 'when', 'tolerance'])
+
+# Rows failing `mask` are reported once and skipped by every check that follows
+Guard = namedtuple('Guard', ['mask', 'column'])
+
+def check(column, expected, when=None, tolerance=None):
+    return Check(column, wrap(expected), when, tolerance if tolerance is not None else default_tolerance(column))
+
+def guard(mask, column):
+    return Guard(mask, column)
+
+# An issue report: the rows where `when` holds, projected onto `columns` ((label, column) pairs)
+Report = namedtuple('Report', ['when', 'columns'])
+
+def report(when, columns):
+    return Report(when, tuple(columns))
+
+# A compiled rule list: `nodes` holds each distinct sub-expression once, children before parents
+Plan = namedtuple('Plan', ['nodes', 'steps', 'reports'])
+
+def compile_rules(rules, reports=None):
+    # Issue reports are compiled into the same plan, so the columns they share with the
+    # formula checks are read and converted only once per sheet
+    slots = {}
+    nodes = []
+
+    def intern(expr):
+        if expr.key not in slots:
+            children = tuple(intern(arg) for arg in expr.args)
+            slots[expr.key] = len(nodes)
+            nodes.append((expr.op, expr.params, children))
+        return slots[expr.key]
+
+    steps = []
+    for rule in rules:
+        if isinstance(rule, Guard):
+            steps.append(('guard', rule.column, intern(rule.mask), None, None, None))
+        else:
+            when = intern(rule.when) if rule.when is not None else None
+            steps.append(('check', rule.column, intern(rule.expected), when, intern(col(rule.column)), rule.tolerance))
+    compiled_reports = tuple((name, intern(wrap(rule.when)), rule.columns) for name, rule in (reports or {}).items())
+    return Plan(tuple(nodes), tuple(steps), compiled_reports)
+
+def _union(*masks):
+    masks = [mask for mask in masks if mask is not None]
+    if not masks:
+        return None
+    return reduce(np.logical_or, masks)
+
+def _taken(conditions, branches, size):
+    # The flags of the branch each row takes: an if/else in the row loop only computed that one
+    if all(branch is None for branch in branches):
+        return None
+    branches = [np.zeros(size, dtype=bool) if branch is None else _broadcast(branch, size, bool) for branch in branches]
+    return np.select(conditions, branches[:-1], branches[-1])
+
+def _read_column(df, name):
+    # Whole-column counterpart of safe_get_value: missing columns and NaN cells read as 0.
+    # Cells that are not numbers are flagged, since arithmetic on them raised in the row loop.
+    if name not in df.columns:
+        return np.zeros(len(df)), None
+    raw = df[name]
+    if pd.api.types.is_numeric_dtype(raw) and not pd.api.types.is_bool_dtype(raw):
+        values = raw.to_numpy(dtype=float, na_value=np.nan)
+        invalid = None
+    else:
+        converted = pd.to_numeric(raw, errors='coerce')
+        values = converted.to_numpy(dtype=float, na_value=np.nan)
+        invalid = (raw.notna() & converted.isna()).to_numpy()
+        if not invalid.any():
+            invalid = None
+    return np.where(np.isnan(values), 0.0, values), invalid
+
+_UFUNCS = {
+    'add': np.add, 'sub': np.subtract, 'mul': np.multiply,
+    'lt': np.less, 'le': np.less_equal, 'gt': np.greater, 'ge': np.greater_equal, 'eq': np.equal,
+    'and': np.logical_and, 'or': np.logical_or, 'not': np.logical_not
+}
+
+def _evaluate(df, plan):
+    # Per node: its values, the rows it cannot be computed for, which of those divide by zero and
+    # which hold a text cell as is. A text cell only raised once arithmetic used it; checked
+    # unchanged, the row loop compared it with != like any other value.
+    values = []
+    errors = []
+    divisions = []
+    texts = []
+    for op, params, children in plan.nodes:
+        args = [values[i] for i in children]
+        error = _union(*[errors[i] for i in children])
+        division = _union(*[divisions[i] for i in children])
+        text = None
+        if op == 'col':
+            value, error = _read_column(df, params)
+            text = error
+        elif op == 'const':
+            value = params
+        elif op == 'filled':
+            if params in df.columns:
+                value = (df[params].notna() & df[params].ne(0)).to_numpy()
+            else:
+                value = np.zeros(len(df), dtype=bool)
+        elif op == 'blank':
+            if params in df.columns:
+                value = df[params].isna().to_numpy()
+            else:
+                value = np.ones(len(df), dtype=bool)
+        elif op == 'text_in':
+            name, choices = params
+            if name in df.columns:
+                value = df[name].isin(choices).to_numpy()
+            else:
+                value = np.full(len(df), 0 in choices)
+        elif op in _UFUNCS:
+            value = _UFUNCS[op](*args)
+        elif op == 'div':
+            # Python raises ZeroDivisionError for these rows, so they count as errors
+            zero = np.asarray(args[1]) == 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                value = np.where(zero, np.nan, np.divide(args[0], args[1]))
+            if zero.any():
+                zero = np.broadcast_to(zero, (len(df),))
+                # An operand that could not be computed fails first, as it would in Python
+                if error is not None:
+                    zero = zero & ~error
+                error = _union(error, zero)
+                division = _union(division, zero)
+        elif op == 'max':
+            value = reduce(np.maximum, args)
+        elif op == 'where':
+            value = np.where(*args)
+            condition = [_broadcast(args[0], len(df), bool)]
+            error = _union(errors[children[0]], _taken(condition, [errors[i] for i in children[1:]], len(df)))
+            division = _union(divisions[children[0]], _taken(condition, [divisions[i] for i in children[1:]], len(df)))
+            text = _passed_on(_taken(condition, [texts[i] for i in children[1:]], len(df)), errors[children[0]])
+        elif op == 'select':
+            conditions = [np.broadcast_to(c, (len(df),)) for c in args[:params]]
+            value = np.select(conditions, args[params:2 * params], args[-1])
+            error = _union(*[errors[i] for i in children[:params]], _taken(conditions, [errors[i] for i in children[params:]], len(df)))
+            division = _union(*[divisions[i] for i in children[:params]], _taken(conditions, [divisions[i] for i in children[params:]], len(df)))
+            text = _passed_on(_taken(conditions, [texts[i] for i in children[params:]], len(df)),
+                              _union(*[errors[i] for i in children[:params]]))
+        elif op == 'tier':
+            name, table = params
+            value = np.full(len(df), np.nan)
+            keyed = np.zeros(len(df), dtype=bool)
+            if name in df.columns:
+                levels = _broadcast(args[0], len(df)) if args else np.zeros(len(df))
+                for key, bounds, choices in table:
+                    rows = np.flatnonzero(df[name].isin([key]).to_numpy())
+                    keyed[rows] = True
+                    # A NaN level is past every bound and falls in the last tier
+                    tiers = np.searchsorted(bounds, levels[rows]).clip(max=len(bounds) - 1)
+                    value[rows] = np.asarray(choices, dtype=float)[tiers]
+            # The level is only compared for rows whose key is in the table
+            if error is not None:
+                error = error & keyed
+                division = None if division is None else division & keyed
+        else:
+            raise ValueError(f"Unknown operation '{op}'")
+        values.append(value)
+        errors.append(error)
+        divisions.append(division)
+        texts.append(text)
+    return values, errors, divisions, texts
+
+def _passed_on(text, condition_error):
+    # A condition that could not be evaluated raised before any branch was taken
+    if text is None or condition_error is None:
+        return text
+    return text & ~condition_error
+
+def _raw_text(df, plan, values, node, positions):
+    # The cells a text-holding node passed on unchanged, at `positions`
+    op, params, children = plan.nodes[node]
+    if op == 'col':
+        return df[params].to_numpy(dtype=object)[positions]
+    if op == 'where':
+        conditions = [_broadcast(values[children[0]], len(df), bool)[positions]]
+        branches = children[1:]
+    else:
+        conditions = [_broadcast(values[i], len(df), bool)[positions] for i in children[:params]]
+        branches = children[params:]
+    cells = [_raw_text(df, plan, values, i, positions) if plan.nodes[i][0] in ('col', 'where', 'select')
+             else np.full(len(positions), None, dtype=object) for i in branches]
+    return np.select(conditions, cells[:-1], cells[-1])
+
+def _broadcast(values, size, dtype=float):
+    values = np.asarray(values, dtype=dtype)
+    if values.shape != (size,):
+        values = np.broadcast_to(values, (size,))
+    return values
+
+MISMATCH_COLUMNS = ['Row', 'Date', 'Column', 'Expected', 'Actual']
+
+# Rows a check or report could not be evaluated for, one row per (row, rule). They are collected
+# as a table rather than logged one by one, and summarized per rule and error.
+ROW_ERROR_COLUMNS = ['Row', 'Rule', 'Error']
+SAMPLE_ROWS = 5
+
+def _row_errors(rows, positions, order, rule, error):
+    return pd.DataFrame({'position': positions, 'order': order, 'Row': rows[positions], 'Rule': rule, 'Error': error})
+
+def _failure(division, positions):
+    if division is None:
+        return 'Unsupported value'
+    return np.where(division[positions], 'Division by zero', 'Unsupported value')
+
+def _in_row_order(frames, columns):
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    df = pd.concat(frames, ignore_index=True).sort_values(['position', 'order'], kind='stable')
+    return df.drop(columns=['position', 'order']).reset_index(drop=True)
+
+def summarize_row_errors(row_errors_df):
+    # One line per rule and error: how many rows failed and the first few of them
+    return row_errors_df.groupby(['Rule', 'Error'], sort=False)['Row'].agg(
+        Rows='size', **{'Sample Rows': lambda rows: ', '.join(map(str, rows.iloc[:SAMPLE_ROWS]))}
+    ).reset_index()
+
+def log_row_errors(row_errors_df):
+    if row_errors_df.empty:
+        return
+    for rule, error, count, sample in summarize_row_errors(row_errors_df).itertuples(index=False):
+        more = ', ...' if count > SAMPLE_ROWS else ''
+        logging.error(f"{error} for '{rule}' in {count} rows (rows {sample}{more})")
+
+def _differs(actual, expected, allowed):
+    different = actual != expected
+    margin = allowed.absolute + allowed.relative * np.abs(expected)
+    if allowed.decimals is not None:
+        margin = margin + 0.5 * 10.0 ** -allowed.decimals
+    if np.any(margin):
+        # NaN on either side never matches; equal infinities still do
+        with np.errstate(invalid='ignore'):
+            different &= ~(np.abs(actual - expected) <= margin)
+    return different
+
+def _mismatches(df, plan, values, errors, divisions, texts, row_errors):
+    size = len(df)
+    rows = np.asarray(df.index) + 3
+    dates = df['date'].to_numpy() if 'date' in df.columns else np.full(size, np.nan)
+    # Rows that raised in an earlier check are skipped by later ones, as in the row-by-row loop
+    active = np.ones(size, dtype=bool)
+    frames = []
+
+    for order, (kind, column, node, when, actual_node, allowed) in enumerate(plan.steps):
+        if kind == 'guard':
+            passed = _broadcast(values[node], size, bool)
+            failed = np.flatnonzero(active & ~passed)
+            if len(failed):
+                row_errors.append(_row_errors(rows, failed, order, column, f'Unknown {column}'))
+            active &= passed
+            continue
+
+        # Rows outside `when` never computed the expected value, so it cannot fail for them
+        applicable = active if when is None else active & _broadcast(values[when], size, bool)
+        expected_is_text = texts[node]
+        if errors[node] is not None:
+            raised = errors[node] if expected_is_text is None else errors[node] & ~expected_is_text
+            failed = np.flatnonzero(applicable & raised)
+            if len(failed):
+                row_errors.append(_row_errors(rows, failed, order, column, _failure(divisions[node], failed)))
+            active[failed] = False
+            applicable[failed] = False
+
+        expected = _broadcast(values[node], size)
+        actual = values[actual_node]
+        actual_is_text = texts[actual_node]
+        different = _differs(actual, expected, allowed)
+        if actual_is_text is not None:
+            different |= actual_is_text
+        if expected_is_text is not None:
+            different |= expected_is_text
+        positions = np.flatnonzero(applicable & different)
+        if not len(positions):
+            continue
+
+        expected_values = expected[positions]
+        if expected_is_text is not None and expected_is_text[positions].any():
+            raw = _raw_text(df, plan, values, node, positions)
+            expected_values = np.where(expected_is_text[positions], raw, expected_values.astype(object))
+        actual_values = actual[positions].astype(object)
+        if actual_is_text is not None and actual_is_text[positions].any():
+            raw = df[column].to_numpy()[positions]
+            actual_values = np.where(actual_is_text[positions], raw, actual_values)
+        if expected_is_text is not None and actual_is_text is not None:
+            # The same text on both sides was equal under !=
+            same = expected_is_text[positions] & actual_is_text[positions] & (expected_values == actual_values)
+            if same.any():
+                keep = ~same
+                positions, expected_values, actual_values = positions[keep], expected_values[keep], actual_values[keep]
+        frames.append(pd.DataFrame({
+            'position': positions,
+            'order': order,
+            'Row': rows[positions],
+            'Date': dates[positions],
+            'Column': column,
+            'Expected': expected_values,
+            'Actual': actual_values
+        }))
+
+    return _in_row_order(frames, MISMATCH_COLUMNS)
+
+def _report(df, name, order, when, columns, values, errors, divisions, row_errors):
+    rows = np.asarray(df.index) + 3
+    matched = _broadcast(values[when], len(df), bool)
+    if errors[when] is not None:
+        # Text in a numeric column cannot be compared, so the row goes to the row errors instead
+        failed = np.flatnonzero(errors[when])
+        if len(failed):
+            row_errors.append(_row_errors(rows, failed, order, name, _failure(divisions[when], failed)))
+        matched = matched & ~errors[when]
+    positions = np.flatnonzero(matched)
+    data = {'Row': rows[positions]}
+    for label, column in columns:
+        data[label] = df[column].to_numpy()[positions] if column in df.columns else np.nan
+    return pd.DataFrame(data)
+
+def run_plan(df, plan):
+    # Formula mismatches, every issue report and the rows that could not be evaluated, from a
+    # single evaluation of the plan. The row errors are logged once, summarized per rule.
+    with stage('evaluate'):
+        values, errors, divisions, texts = _evaluate(df, plan)
+    row_errors = []
+    with stage('mismatches'):
+        results = {'mismatches': _mismatches(df, plan, values, errors, divisions, texts, row_errors)}
+    for order, (name, when, columns) in enumerate(plan.reports, len(plan.steps)):
+        with stage(name):
+            results[name] = _report(df, name, order, when, columns, values, errors, divisions, row_errors)
+    results['row_errors'] = _in_row_order(row_errors, ROW_ERROR_COLUMNS)
+    log_row_errors(results['row_errors'])
+    return results
@@ -0,0 +1,56 @@
+import pandas as pd
+import numpy as np
+
+# Low-cardinality text columns kept as category dtype; only their categories get normalized.
+# These are the keys the logic modules group and filter on, so isin masks and groupbys run
+# on small integer codes instead of strings.
+CATEGORY_COLUMNS = [
+    'site name', 'vendor', 'session', 'meal type', 'order type',
+    'month', 'meal type (only lunch)', 'menu item', 'menu  item', 'whole fruits'
+]
+
+def _normalize_values(values):
+    # Same result as .str.lower().str.strip(): cells that are not text become NaN
+    return pd.Index(values, dtype=object).str.lower().str.strip()
+
+def _normalize_category(series):
+    categorical = series.astype('category').cat
+    normalized = _normalize_values(categorical.categories)
+    # Categories that differ only in case or spacing collapse into one; sorted so groupbys
+    # order their output the same way as on plain text
+    categories = normalized.dropna().unique().sort_values()
+    mapping = np.append(categories.get_indexer(normalized), -1)
+    codes = mapping[categorical.codes]
+    return pd.Series(pd.Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+
+def _normalize_text(series):
+    # Normalize each distinct value once and scatter the results back to the rows
+    codes, uniques = pd.factorize(series)
+    normalized = np.append(_normalize_values(uniques).to_numpy(), np.nan)
+    return pd.Series(normalized[codes], index=series.index, name=series.name)
+
+def normalize_sheet(df):
+    # Lowercase and strip column names and text cells; the 'date' column is left untouched
+    df.columns = df.columns.str.lower().str.strip()
+    for position, name in enumerate(df.columns):
+        if name == 'date' or df.iloc[:, position].dtype != object:
+            continue
+        series = df.iloc[:, position]
+        if name in CATEGORY_COLUMNS:
+            df.isetitem(position, _normalize_category(series))
+        else:
+            df.isetitem(position, _normalize_text(series))
+    return df
+
+def drop_unused_categories(df):
+    # After filtering to one month, keep only the labels still present so the codes stay compact
+    for position, dtype in enumerate(df.dtypes):
+        if isinstance(dtype, pd.CategoricalDtype):
+            df.isetitem(position, df.iloc[:, position].cat.remove_unused_categories())
+    return df
+
+def month_index(df):
+    # Row positions of every month, in the order the months first appear. Rows without a month
+    # belong to none. Selecting a month is then a dict lookup and a take of its rows.
+    indices = df.groupby('month', observed=True, sort=False).indices
+    return dict(sorted(indices.items(), key=lambda item: item[1][0]))
@@ -0,0 +1,88 @@
+import os
+import streamlit as st
+from audit_result import aggregates_frame
+from mismatch_engine import summarize_row_errors
+
+# Numbers are shown with one decimal. The formatting is applied when a table is rendered,
+# so the frames stay numeric and are neither copied nor modified.
+NUMBER_FORMAT = '%.1f'
+
+# Tables longer than this are shown a page at a time, with an option to show every row
+PAGE_ROWS = int(os.environ.get('MIS_PAGE_ROWS', '500'))
+
+def numeric_columns(df):
+    return list(df.select_dtypes(include=['float', 'int']).columns)
+
+def number_column_config(df):
+    return {column: st.column_config.NumberColumn(format=NUMBER_FORMAT) for column in numeric_columns(df)}
+
+def show_dataframe(df):
+    st.dataframe(df, column_config=number_column_config(df), hide_index=True)
+
+def show_table(df, key, page_rows=None):
+    # Results viewer shared by every report section. st.dataframe only draws the visible rows;
+    # paging keeps the payload sent to the browser bounded as well. `key` must be unique on the page.
+    page_rows = page_rows or PAGE_ROWS
+    if len(df) <= page_rows:
+        show_dataframe(df)
+        return
+    if st.checkbox(f"Show all {len(df)} rows", key=f'{key}_show_all'):
+        show_dataframe(df)
+    else:
+        pages = -(-len(df) // page_rows)
+        page = st.number_input(f"Page (of {pages}, {page_rows} rows each)", min_value=1, max_value=pages,
+                               value=1, step=1, key=f'{key}_page')
+        start = (page - 1) * page_rows
+        show_dataframe(df.iloc[start:start + page_rows])
+    # The CSV is only built when the button is clicked
+    st.download_button("Download CSV", lambda: df.to_csv(index=False), file_name=f'{key}.csv', mime='text/csv',
+                       key=f'{key}_download', on_click='ignore')
+
+# Seconds get three decimals, most stages take well under a tenth of a second
+def show_stage_timings(container, timings):
+    container.dataframe(timings, hide_index=True, column_config={
+        'Seconds': st.column_config.NumberColumn(format='%.3f'),
+        'Peak MB': st.column_config.NumberColumn(format=NUMBER_FORMAT),
+        'RSS MB': st.column_config.NumberColumn(format=NUMBER_FORMAT)
+    })
+
+# Heading shown above a report with rows, and the message shown when it has none
+REPORT_SECTIONS = {
+    'mismatches': ("<span style='color:red'>Mismatched Data:heavy_exclamation_mark:</span>",
+                   "<span style='color:green'>No mismatch found.</span> :white_check_mark:"),
+    'pax_in_bf_snacks': ("<span style='color:red'>Paxs in BF & Snack:</span> :heavy_exclamation_mark:",
+                         "<span style='color:green'>No Pax in BF & Snack found.</span> :white_check_mark:"),
+    'missing_pax_in_lunch': ("<span style='color:red'>Missing Pax in Lunch:</span> :heavy_exclamation_mark:",
+                             "<span style='color:green'>No Missing Pax in Lunch found.</span> :white_check_mark:"),
+    'buying_value_issues': ("<span style='color:red'>Buying Value Issues</span> :heavy_exclamation_mark:",
+                            "<span style='color:green'>No buying value issues found.</span> :white_check_mark:"),
+    'selling_value_issues': ("<span style='color:red'>Selling Value Issues</span> :heavy_exclamation_mark:",
+                             "<span style='color:green'>No selling value issues found.</span> :white_check_mark:"),
+    'popup_selling_issues': ("<span style='color:red'>Popup Selling Issues.</span> :heavy_exclamation_mark:",
+                             "<span style='color:green'>No selling price found in Pop-up.</span> :white_check_mark:"),
+    'karbon_expenses': ("### Karbon Expenses", "No Karbon expenses found."),
+    'row_errors': ("<span style='color:red'>Rows That Could Not Be Checked</span> :warning:",
+                   "<span style='color:green'>Every row could be checked.</span> :white_check_mark:")
+}
+
+# Reports shown summarized rather than row by row
+REPORT_SUMMARIES = {'row_errors': summarize_row_errors}
+
+def render_result(result):
+    st.subheader("")
+    if result.average_prices is not None:
+        st.subheader("Average Buying Price and Selling Price")
+        show_table(result.average_prices, 'average_prices')
+        st.markdown("---")
+
+    for name, df in result.reports.items():
+        found, empty = REPORT_SECTIONS[name]
+        if len(df):
+            st.write(found, unsafe_allow_html=True)
+            show_table(REPORT_SUMMARIES.get(name, lambda df: df)(df), name)
+        else:
+            st.write(empty, unsafe_allow_html=True)
+        st.markdown("---")
+
+    st.subheader("Aggregated Values")
+    show_table(aggregates_frame(result.aggregates), 'aggregated_values')
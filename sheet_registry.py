@@ -0,0 +1,75 @@
+# Sheet names handled by each business logic module
+BUSINESS_LOGIC_SHEETS = {
+    "business_logic_1": ["Postman"],
+    "business_logic_2": ["Pratilipi"],
+    "business_logic_3": ["Quzizz","Synergy","Amadeus","Awfis"],
+    "business_logic_4": ["Medtrix","Odessa","MG Eli Lilly","Scaler-Prequin"],
+    "business_logic_5": ["Gojek","Microchip Main Meal"],
+    "business_logic_6": ["HD Works"],
+    "business_logic_7": ["MPL"],
+    "business_logic_8": ["Tonbo","Tadano Escorts","Siemens - Tuckshop","Dynasty","Citrix Driver's Lunch & Dinner","sharefile"],
+    "business_logic_9": ["Rippling","Tessolve"],
+    "business_logic_10": ["MPL -  Infinity Plates","Tekion.","Groww Koramangala","Groww VTP","Groww Mumbai","Ather Mumbai","Epam"],
+    "business_logic_11": ["Telstra MainMeal(Cash & Carry)"],
+    "business_logic_12": ["Eli Lilly Wallet", "Sheet1"], # get this clarified
+    "business_logic_13": ["Sinch","O9 Solutions"],
+    "business_logic_14": ["RAKUTEN-2","Clario"],
+    "business_logic_15": ["Waters Main Meal"], # used BL6 and might be same for seminens
+    "business_logic_16": ["Quest Company Paid"],
+    "business_logic_17": ["Waters Tuck Shop"],
+    "business_logic_18": ["H&M"],
+    "business_logic_19": ["Lam Research","Corning","PhonePe"],
+    "business_logic_20": ["Micochip Juice Junction"],
+    "business_logic_21": ["Ather BLR"],
+    "business_logic_22": ["Ather Plant 1.","Ather Plant 2.","SAEL Delhi","Gojek."],  #gojek is ncr
+    "business_logic_23": ["STRIPE MIS","TEA-Breakfast"],
+    "business_logic_24": ["FRUIT N JUICE MIS"],
+    "business_logic_25": ["Siemens","Toasttab","Gartner"],
+    "business_logic_26": ["DTCC Wallet"],
+    "business_logic_27": ["Siemens_Pune"],
+    "business_logic_28": ["CSG-Pune"],
+    "business_logic_29": ["Salesforce-GGN"],
+    "business_logic_30": ["Salesforce - Jaipur"],
+    "business_logic_31": ["Ather - Main Meal"],
+    "business_logic_32": ["Siemens."], # NCR
+    "business_logic_33": ["Postman.","Citrix-Tuckshop"],
+    "business_logic_34": ["Sinch Lunch"],
+    "business_logic_35": ["Sinch Dinner"],
+    "business_logic_36": ["STRYKER MIS - '2024"],
+    "business_logic_37": ["EGL"],
+    "business_logic_38": ["Truecaller"],
+    "business_logic_39": ["Sharefile Wallet"],
+    "business_logic_40": ["Gold Hill-Main Meal","Goldhill Juice Junction.","Healthineer International","Priteck - Main meal","Pritech park Juice junction"],
+    "business_logic_41": ["Siemens-BLR","Siemens Juice Counter"],
+    "business_logic_42": ["Heathineer Factory"],
+    "business_logic_43": ["Airtel Center","Airtel  Plot 5","Airtel NOC Non veg","Airtel international"],
+    "business_logic_44": ["Tekion"],
+    "business_logic_45": ["HD Works(HYD)"],
+    "business_logic_46": ["Airtel Noida"],
+    "business_logic_47": ["Airtel NOC"],
+    "business_logic_48": ["Airtel-Jaya"],
+    "business_logic_49": ["MIQ"],
+    "business_logic_50": ["MIQ MRP"],
+
+
+    "event_logic_1": ["Telstra Event.","Telstra Event","Events"],
+    "event_logic_2": ["Eli Lilly Event"],
+    "event_logic_3": ["Waters Event"],
+    "event_logic_4": ["Icon-event-Bangalore","Sinch Event sheet","infosys Event+ Additional Sales","Other Events.","Telstra Event sheet","MPL-Delhi","Grow event"],
+    "event_logic_5": ["Other Events"],
+    "event_logic_6": ["Lam Research Event"],
+    "event_logic_7": ["ICON CHN EVENT"],
+    "event_logic_8": ["other Event MIS"],
+    "event_logic_9": ["Amazon  PNQ Events -"],
+
+
+    "other_revenues": [""]
+    # Add more mappings as needed
+}
+
+def find_business_logic(sheet_name):
+    # Name of the module (and of its entry function) for the sheet, or None if it is not mapped
+    for module_name, sheets in BUSINESS_LOGIC_SHEETS.items():
+        if sheet_name in sheets:
+            return module_name
+    return None
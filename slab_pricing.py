@@ -0,0 +1,24 @@
+import numpy as np
+from collections import namedtuple
+from mismatch_engine import tiered
+
+MEAL_TYPE_COLUMN = 'meal type (only lunch)'
+
+# One row of a price table: `meal_type` rows whose MG/pax is at most `upper_bound` (and above the
+# bound of the slab before it) are priced `buying_price` and `selling_price`. The last slab of a
+# meal type has no upper bound (None). A price the sheet does not check is left as None.
+Slab = namedtuple('Slab', ['meal_type', 'upper_bound', 'buying_price', 'selling_price'])
+
+def slab(meal_type, upper_bound, buying_price, selling_price):
+    return Slab(meal_type, upper_bound, buying_price, selling_price)
+
+def slab_price(slabs, price, mg_pax=None, meal_type=MEAL_TYPE_COLUMN):
+    # Expected 'buying_price' or 'selling_price' of every row, from the slab its meal type and
+    # MG/pax fall in. Meal types missing from the table give NaN. Without mg_pax each meal type
+    # has a single price.
+    table = {}
+    for row in slabs:
+        bound = np.inf if row.upper_bound is None else row.upper_bound
+        value = getattr(row, price)
+        table.setdefault(row.meal_type, []).append((bound, np.nan if value is None else value))
+    return tiered(meal_type, [(key, *zip(*sorted(rows))) for key, rows in table.items()], mg_pax)
@@ -0,0 +1,111 @@
+import time
+import logging
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+import pandas as pd
+import psutil
+
+# Profiler of the current script run. Code outside a profiled run calls stage() at no cost.
+_active = contextvars.ContextVar('stage_profiler', default=None)
+
+MB = 1024 * 1024
+
+# tracemalloc is process wide. It runs while any session is inside a profiled top level stage
+# and is stopped by whichever of them finishes last, never under another session's feet.
+_tracing_lock = threading.Lock()
+_tracing_stages = 0
+
+def _start_tracing():
+    global _tracing_stages
+    with _tracing_lock:
+        _tracing_stages += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+def _stop_tracing():
+    global _tracing_stages
+    with _tracing_lock:
+        _tracing_stages -= 1
+        if _tracing_stages == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+# Wall time and memory of each stage of a review. Stages nest and are named by their path,
+# e.g. 'audit / find_issues'. Peak is the most Python and NumPy memory held at once during the
+# stage, above what was held when it began (tracemalloc); RSS is the resident memory of the
+# process when the stage ended (psutil). tracemalloc is process wide, so the peaks of sessions
+# profiled at the same time overlap.
+class StageProfiler:
+    def __init__(self, trace_memory=True, on_stage=None):
+        self.trace_memory = trace_memory
+        self.records = []
+        # Called with the profiler after every top level stage, e.g. to redraw a panel
+        self._on_stage = on_stage
+        self._stack = []
+        self._started = 0
+        self._process = psutil.Process()
+
+    def _traced(self):
+        return tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+
+    @contextmanager
+    def stage(self, name):
+        outermost = not self._stack
+        if outermost and self.trace_memory:
+            _start_tracing()
+        if self._stack:
+            # Fold the peak so far into the enclosing stage before this one resets it
+            self._stack[-1]['peak'] = max(self._stack[-1]['peak'], self._traced()[1])
+        current, _ = self._traced()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        frame = {'name': name, 'order': self._started, 'start_memory': current, 'peak': current}
+        self._started += 1
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            frame['peak'] = max(frame['peak'], self._traced()[1])
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], frame['peak'])
+            path = ' / '.join([parent['name'] for parent in self._stack] + [name])
+            if outermost and self.trace_memory:
+                _stop_tracing()
+            self._record(frame['order'], path, seconds, max(frame['peak'] - frame['start_memory'], 0))
+
+    def _record(self, order, path, seconds, peak):
+        record = {
+            'order': order,
+            'Stage': path,
+            'Seconds': seconds,
+            'Peak MB': peak / MB if self.trace_memory else None,
+            'RSS MB': self._process.memory_info().rss / MB
+        }
+        self.records.append(record)
+        peak_text = f"{record['Peak MB']:.1f}" if self.trace_memory else 'na'
+        logging.info(f"stage={path!r} seconds={seconds:.4f} peak_mb={peak_text} rss_mb={record['RSS MB']:.1f}")
+        if not self._stack and self._on_stage:
+            self._on_stage(self)
+
+    def frame(self):
+        # Stages listed in the order they started, so every stage comes before the stages inside it
+        records = sorted(self.records, key=lambda record: record['order'])
+        return pd.DataFrame(records, columns=['Stage', 'Seconds', 'Peak MB', 'RSS MB'])
+
+def activate(profiler):
+    # Makes `profiler` (or None) the one stage() reports to for the rest of this run. Memory is
+    # only traced during profiled stages, as tracemalloc slows every allocation down.
+    _active.set(profiler)
+
+@contextmanager
+def stage(name):
+    profiler = _active.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
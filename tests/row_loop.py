@@ -0,0 +1,237 @@
+import pandas as pd
+from mismatch_engine import MISMATCH_COLUMNS, default_tolerance
+
+# The row-by-row loops the logics ran before the column engine, kept as the reference its
+# results are checked against. Each logic is a function of one row (a dict) and `check`.
+
+class UnknownValue(Exception):
+    def __init__(self, column):
+        super().__init__(column)
+        self.column = column
+
+def value(row, column):
+    # safe_get_value: missing columns and blank cells read as 0. The float keeps text cells
+    # failing in arithmetic, as they did against the float columns of a real sheet.
+    cell = row.get(column)
+    if cell is None or (not isinstance(cell, str) and pd.isna(cell)):
+        return 0.0
+    return cell
+
+def differs(column, expected, actual):
+    if expected is None:
+        return True
+    if isinstance(expected, str) or isinstance(actual, str):
+        # check_mismatch compared with !=, which text does not raise on
+        return expected != actual
+    if actual == expected:
+        return False
+    allowed = default_tolerance(column)
+    margin = allowed.absolute + allowed.relative * abs(expected) + 0.5 * 10.0 ** -allowed.decimals
+    return not abs(actual - expected) <= margin
+
+def _error(exception):
+    if isinstance(exception, UnknownValue):
+        return f'Unknown {exception.column}'
+    if isinstance(exception, ZeroDivisionError):
+        return 'Division by zero'
+    return 'Unsupported value'
+
+def run_loop(df, logic):
+    # The mismatches frame run_plan returns, and {row: error} for the rows that raised
+    mismatches = []
+    errors = {}
+    for index, row in df.to_dict('index').items():
+        def check(column, expected):
+            actual = value(row, column)
+            if differs(column, expected, actual):
+                mismatches.append((index + 3, row.get('date'), column, float('nan') if expected is None else expected, actual))
+        try:
+            logic(row, check)
+        except (UnknownValue, ZeroDivisionError, TypeError) as exception:
+            errors[index + 3] = _error(exception)
+    return pd.DataFrame(mismatches, columns=MISMATCH_COLUMNS), errors
+
+def fill(df, logic, rows):
+    # Writes each check's expected value into `rows` of a copy of df, money rounded to the
+    # paisa and counts to whole numbers, so those rows only differ from their formulas by
+    # rounding. Rows stop filling at their first error.
+    records = df.to_dict('index')
+    for index in rows:
+        row = records[index]
+        def check(column, expected):
+            if expected is not None and not isinstance(expected, str):
+                row[column] = round(expected, default_tolerance(column).decimals)
+        try:
+            logic(row, check)
+        except (UnknownValue, ZeroDivisionError, TypeError):
+            pass
+    return pd.DataFrame.from_dict(records, orient='index', columns=df.columns).astype(df.dtypes.to_dict())
+
+def business_logic_1(row, check):
+    check('buying price', value(row, 'buying price ai') / value(row, 'gst'))
+    check('buying amt ai', value(row, 'buying price ai') * value(row, 'buying pax') + value(row, 'buying transportation'))
+    check('buying pax', value(row, 'ordered pax/vendor mg'))
+    check('selling pax', max(value(row, 'client mg/pre order'), value(row, 'actual consumption')))
+    check('selling amount', value(row, 'selling pax') * value(row, 'selling price') + value(row, 'selling transportation'))
+    check('commission', value(row, 'selling amount') - value(row, 'buying amt ai') + value(row, 'penalty on vendor') - value(row, 'penalty on smartq'))
+
+def business_logic_7(row, check):
+    check('buying price', value(row, 'buying price ai') / value(row, 'gst'))
+    buying_amt_ai = value(row, 'buying price ai') * value(row, 'buying pax') + value(row, 'buying transportation')
+    check('buying amt ai', buying_amt_ai)
+
+    meal_type = row.get('meal type')
+    if meal_type in ['buffet', 'packed']:
+        selling_pax = value(row, 'client dc cosumption')
+    elif meal_type == 'saladbar':
+        selling_pax = value(row, 'buying pax')
+    else:
+        raise UnknownValue('meal type')
+    check('selling pax', selling_pax)
+
+    selling_amount = value(row, 'selling pax') * value(row, 'selling price') + value(row, 'selling transportation')
+    check('selling amount', selling_amount)
+    check('commission', value(row, 'selling amount') - value(row, 'buying amt ai') + value(row, 'penalty on vendor') - value(row, 'penalty on smartq'))
+
+LUNCH_SESSIONS = ['lunch-non veg', 'lunch-veg']
+
+def business_logic_18(row, check):
+    check('buying price', value(row, 'buying price ai') / value(row, 'gst'))
+    check('buying amt ai', value(row, 'buying price ai') * value(row, 'buying pax') + value(row, 'buying transportation'))
+    check('commission', value(row, 'selling amount') - value(row, 'buying amt ai') + value(row, 'penalty on vendor') - value(row, 'penalty on smartq'))
+    if row.get('session') in LUNCH_SESSIONS:
+        selling_pax = max(value(row, 'client mg/pre order'), value(row, 'ordered pax/vendor mg'), value(row, 'actual consumption'))
+        check('selling pax', selling_pax)
+        check('selling amount', selling_pax * value(row, 'selling price'))
+
+def _filled(row, column):
+    cell = row.get(column)
+    return cell is not None and pd.notna(cell) and cell != 0
+
+def _blank(row, column):
+    cell = row.get(column)
+    return cell is None or (not isinstance(cell, str) and pd.isna(cell))
+
+def business_logic_18_reports(df):
+    # Rows of the two session reports
+    pax_in_bf_snacks = []
+    missing_pax_in_lunch = []
+    for index, row in df.to_dict('index').items():
+        session = row.get('session')
+        if session in ['breakfast', 'snacks'] and (_filled(row, 'selling pax') or _filled(row, 'selling amount')):
+            pax_in_bf_snacks.append(index + 3)
+        if session in LUNCH_SESSIONS and (_blank(row, 'selling pax') or _blank(row, 'selling amount')):
+            missing_pax_in_lunch.append(index + 3)
+    return {'pax_in_bf_snacks': pax_in_bf_snacks, 'missing_pax_in_lunch': missing_pax_in_lunch}
+
+def business_logic_43(row, check):
+    meal_type = value(row, 'meal type (only lunch)')
+    buying_mg_pax = value(row, 'buying mg/pax')
+    if meal_type == 'veg':
+        if buying_mg_pax <= 500:
+            buying_price = 49
+        elif buying_mg_pax <= 900:
+            buying_price = 48
+        else:
+            buying_price = 47
+    elif meal_type == 'non-veg':
+        if buying_mg_pax <= 500:
+            buying_price = 55
+        elif buying_mg_pax <= 900:
+            buying_price = 52.5
+        else:
+            buying_price = 50
+    else:
+        buying_price = None
+    check('buying price ai', buying_price)
+
+    check('delta pax(gap between mg and consumption)', max(
+        value(row, 'buying mg/pax') - (value(row, 'actual consumption/employee') + value(row, 'partners(direct cash sales)')
+                                       + value(row, 'manual entry') + value(row, 'training new joining  staff')),
+        value(row, 'training new joining  staff'), 0))
+    check('total pax buying', value(row, 'actual consumption/employee') + value(row, 'partners(direct cash sales)')
+          + value(row, 'manual entry') + value(row, 'delta pax(gap between mg and consumption)'))
+    check('buying amount', value(row, 'total pax buying') * value(row, 'buying price ai') * 2)
+
+    selling_mg_pax = value(row, 'selling mg/pax')
+    if meal_type == 'veg':
+        if selling_mg_pax <= 500:
+            selling_price = 51.5
+        elif selling_mg_pax <= 900:
+            selling_price = 50.5
+        else:
+            selling_price = 49.5
+    elif meal_type == 'non-veg':
+        if selling_mg_pax <= 500:
+            selling_price = 57.5
+        elif selling_mg_pax <= 900:
+            selling_price = 55
+        else:
+            selling_price = 52.5
+    else:
+        selling_price = None
+    check('selling price', selling_price)
+
+    check('delta pax(gap between mg and consumption) btc', max(
+        value(row, 'selling mg/pax') - (value(row, 'actual consumption/employee') + value(row, 'manual entry')),
+        value(row, 'training new joining  staff btc'), 0))
+
+    consumed = (value(row, 'actual consumption/employee') + value(row, 'partners(direct cash sales)')
+                + value(row, 'manual entry') + value(row, 'training new joining  staff btc'))
+    check('total pax selling', selling_mg_pax if consumed < selling_mg_pax else consumed)
+
+    check('partners(direct cash sales) +employee 50%', value(row, 'partners(direct cash sales)') * value(row, 'selling price') * 2
+          + (value(row, 'actual consumption/employee') + value(row, 'manual entry')) * value(row, 'selling price'))
+    check('total sales', (value(row, 'actual consumption/employee') + value(row, 'manual entry')) * value(row, 'selling price')
+          + value(row, 'delta pax(gap between mg and consumption) btc') * value(row, 'selling price') * 2
+          + value(row, 'partners(direct cash sales) +employee 50%'))
+    check('btc', value(row, 'total sales') - value(row, 'partners(direct cash sales) +employee 50%'))
+    check('comission', value(row, 'total sales') - value(row, 'buying amount'))
+
+def business_logic_48(row, check):
+    meal_type = value(row, 'meal type (only lunch)')
+    if meal_type == 'veg':
+        selling_price = 55
+    elif meal_type == 'non-veg':
+        selling_price = 60
+    else:
+        selling_price = None
+    check('selling price', selling_price)
+
+    buying_mg_pax = value(row, 'buying mg/pax')
+    actual_consumption = value(row, 'actual consumption/employee')
+    partners_sales = value(row, 'partners(direct cash sales)')
+    total = (buying_mg_pax + actual_consumption + partners_sales + value(row, 'manual entry')
+             + value(row, 'training new joining staff') + value(row, 'training new joining staff btc'))
+    check('delta pax(gap between mg and consumption)', actual_consumption - total if total < actual_consumption else 0)
+
+    check('total pax buying', buying_mg_pax + actual_consumption + partners_sales + value(row, 'manual entry')
+          + value(row, 'training new joining  staff'))
+    check('buying amount', value(row, 'total pax buying') * value(row, 'buying price ai'))
+
+    selling_mg_pax = value(row, 'selling mg/pax')
+    if meal_type == 'breakfast':
+        if selling_mg_pax <= 500:
+            selling_price = 65
+        elif selling_mg_pax <= 900:
+            selling_price = 65
+        else:
+            selling_price = 65
+    elif meal_type in ['lunch', 'dinner']:
+        if selling_mg_pax <= 500:
+            selling_price = 51.5
+        elif selling_mg_pax <= 900:
+            selling_price = 50.5
+        else:
+            selling_price = 49.5
+    else:
+        selling_price = None
+    check('selling price', selling_price)
+
+    check('delta pax(gap between mg and consumption) BTC', max(
+        selling_mg_pax - (buying_mg_pax + partners_sales), value(row, 'training new joining staff btc'), 0))
+    consumed = buying_mg_pax + actual_consumption + partners_sales + value(row, 'training new joining staff btc')
+    check('total pax selling', selling_mg_pax if consumed < selling_mg_pax else consumed)
+    check('partners(direct cash sales) amount+Employee 50%', partners_sales * value(row, 'employee 50%'))
+    check('bill to client', (buying_mg_pax + partners_sales) * selling_mg_pax + value(row, 'selling price') * selling_mg_pax)
+    check('commission', value(row, 'total sales') - value(row, 'bill to client'))
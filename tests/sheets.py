@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Random sheets for the tests, shaped like normalized ones: text keys are categories, numbers
+# are mostly whole, with blanks, zeros and the 500/900 MG slab bounds mixed in, and about one
+# row in ten holds the text 'na' in one of `text_columns`.
+def make_sheet(size, numeric, choices=None, numbers=None, text_columns=(), seed=0):
+    rng = np.random.default_rng(seed)
+    data = {'date': pd.Timestamp('2024-05-01') + pd.to_timedelta(rng.integers(0, 31, size), unit='D')}
+    for column, values in (choices or {}).items():
+        data[column] = pd.Categorical(rng.choice(np.array(values, dtype=object), size))
+    for column, values in (numbers or {}).items():
+        data[column] = rng.choice(np.array(values, dtype=float), size)
+    for column in numeric:
+        values = rng.integers(0, 1200, size) + rng.choice([0, 0, 0.5, 0.25], size)
+        values = np.where(rng.random(size) < 0.05, rng.choice([500, 500.5, 900, 900.5], size), values)
+        values[rng.random(size) < 0.1] = 0
+        values[rng.random(size) < 0.1] = np.nan
+        data[column] = values
+    df = pd.DataFrame(data)
+
+    if text_columns:
+        rows = np.flatnonzero(rng.random(size) < 0.1)
+        columns = rng.choice(list(text_columns), len(rows))
+        for column in sorted(set(columns)):
+            df[column] = df[column].astype(object)
+        for row, column in zip(rows, columns):
+            df.at[row, column] = 'na'
+    return df
+
+ORDER_KEYS = {
+    'site name': ['site a', 'site b'],
+    'vendor': ['v1', 'v2'],
+    'order type': ['regular', 'regular-pop-up', 'smartq-pop-up', 'event', 'adhoc', 'food trial', np.nan]
+}
+
+SHEETS = {
+    'business_logic_1': dict(
+        numeric=['buying price ai', 'buying price', 'buying pax', 'buying transportation', 'buying amt ai', 'ordered pax/vendor mg',
+                 'client mg/pre order', 'actual consumption', 'selling pax', 'selling price', 'selling transportation',
+                 'selling amount', 'penalty on vendor', 'penalty on smartq', 'commission'],
+        numbers={'gst': [1.05, 1.18, 1.18, 0, np.nan]},
+        text_columns=['ordered pax/vendor mg', 'buying pax', 'actual consumption', 'selling price', 'commission']),
+    'business_logic_7': dict(
+        numeric=['buying price ai', 'buying price', 'buying pax', 'buying transportation', 'buying amt ai', 'client dc cosumption',
+                 'selling pax', 'selling price', 'selling transportation', 'selling amount', 'penalty on vendor', 'penalty on smartq',
+                 'commission', 'amount'],
+        choices={**ORDER_KEYS, 'session': ['lunch', 'dinner'], 'meal type': ['buffet', 'packed', 'saladbar', 'snacks', np.nan]},
+        numbers={'gst': [1.05, 1.18, 1.18, 0, np.nan]},
+        text_columns=['buying price ai', 'buying pax', 'client dc cosumption', 'selling price', 'selling amount',
+                      'penalty on vendor', 'commission']),
+    'business_logic_18': dict(
+        numeric=['buying price ai', 'buying price', 'buying pax', 'buying transportation', 'buying amt ai', 'selling pax',
+                 'selling price', 'selling amount', 'penalty on vendor', 'penalty on smartq', 'commission', 'client mg/pre order',
+                 'ordered pax/vendor mg', 'actual consumption', 'amount'],
+        choices={**ORDER_KEYS, 'session': ['breakfast', 'lunch-veg', 'lunch-non veg', 'snacks', 'dinner', np.nan],
+                 'meal type': ['veg', 'non-veg']},
+        numbers={'gst': [1.05, 1.18, 1.18, 0, np.nan]},
+        text_columns=['buying price ai', 'selling price', 'selling amount', 'selling pax', 'actual consumption', 'penalty on smartq']),
+    'business_logic_43': dict(
+        numeric=['buying mg/pax', 'selling mg/pax', 'actual consumption/employee', 'partners(direct cash sales)', 'manual entry',
+                 'training new joining  staff', 'training new joining  staff btc', 'delta pax(gap between mg and consumption)',
+                 'total pax buying', 'buying price ai', 'buying amount', 'selling price', 'delta pax(gap between mg and consumption) btc',
+                 'total pax selling', 'partners(direct cash sales) +employee 50%', 'total sales', 'btc', 'comission'],
+        choices={'meal type (only lunch)': ['veg', 'non-veg', 'jain', np.nan]},
+        text_columns=['buying mg/pax', 'selling mg/pax', 'manual entry', 'buying price ai', 'selling price', 'total sales']),
+    'business_logic_48': dict(
+        numeric=['buying mg/pax', 'selling mg/pax', 'actual consumption/employee', 'partners(direct cash sales)', 'manual entry',
+                 'training new joining staff', 'training new joining staff btc', 'training new joining  staff',
+                 'delta pax(gap between mg and consumption)', 'total pax buying', 'buying price ai', 'buying amount', 'selling price',
+                 'delta pax(gap between mg and consumption) BTC', 'total pax selling', 'partners(direct cash sales) amount+Employee 50%',
+                 'employee 50%', 'bill to client', 'total sales', 'commission'],
+        choices={'meal type (only lunch)': ['veg', 'non-veg', 'breakfast', 'lunch', 'dinner', 'snacks', np.nan]},
+        text_columns=['buying mg/pax', 'selling mg/pax', 'selling price', 'employee 50%', 'bill to client'])
+}
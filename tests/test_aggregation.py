@@ -0,0 +1,92 @@
+import operator
+from functools import reduce
+import numpy as np
+import pandas as pd
+import pytest
+import business_logic_7
+from aggregation import Days, aggregate, days, summarize_prices, total
+from sheets import SHEETS, make_sheet
+
+# The per-label filters and sums calculate_aggregated_values ran before aggregate()
+def reference(df, measures):
+    aggregated_data = {}
+    for label, measure in measures:
+        if isinstance(measure, Days):
+            valid_dates_df = df[reduce(operator.or_, [df[column] > 0 for column in measure.columns])]
+            aggregated_data[label] = valid_dates_df['date'].nunique()
+            continue
+        rows = df if measure.order_types is None else df[df['order type'].isin(measure.order_types)]
+        values = rows[measure.columns[0]]
+        for column in measure.columns[1:]:
+            values = values + rows[column]
+        aggregated_data[label] = values.sum()
+    return aggregated_data
+
+def assert_same(result, expected):
+    assert list(result) == list(expected)
+    for label, value in expected.items():
+        assert type(result[label]) is type(value), label
+        if isinstance(value, str):
+            assert result[label] == value, label
+        else:
+            assert result[label] == pytest.approx(value), label
+
+def sheet(size=500, seed=0):
+    rng = np.random.default_rng(seed)
+    df = make_sheet(size, ['buying pax', 'selling pax', 'amount', 'blank'], seed=seed,
+                    choices={'order type': ['regular', 'event', 'adhoc', 'tuckshop', np.nan], 'remarks': ['late', 'ok']})
+    df['blank'] = np.nan
+    df['covers'] = rng.integers(0, 50, size)
+    df['remarks'] = df['remarks'].astype(object)
+    return df
+
+MEASURES = [
+    ('Number of Days', days('buying pax', 'selling pax')),
+    ('Buying Pax (Regular)', total('buying pax', ['regular'])),
+    ('Pax (Event)', total(['buying pax', 'selling pax'], ['event', 'adhoc'])),
+    ('Amount', total('amount')),
+    ('Covers', total('covers')),
+    ('Covers (Tuckshop)', total('covers', ['tuckshop'])),
+    ('Nothing', total('amount', ['live'])),
+    ('Blank', total('blank', ['regular'])),
+    ('Remarks (Event)', total('remarks', ['event']))
+]
+
+def test_aggregate_matches_filtered_sums():
+    df = sheet()
+    assert_same(aggregate(df, MEASURES), reference(df, MEASURES))
+
+def test_aggregate_types():
+    df = sheet()
+    result = aggregate(df, MEASURES)
+    assert type(result['Number of Days']) is int
+    assert type(result['Amount']) is np.float64
+    assert type(result['Covers']) is np.int64
+    assert result['Nothing'] == 0 and result['Blank'] == 0
+    assert isinstance(result['Remarks (Event)'], str)
+
+def test_aggregate_empty_sheet():
+    df = sheet().iloc[:0]
+    measures = [measure for measure in MEASURES if measure[0] != 'Remarks (Event)']
+    assert_same(aggregate(df, measures), reference(df, measures))
+
+def logic_sheet():
+    spec = {key: value for key, value in SHEETS['business_logic_7'].items() if key != 'text_columns'}
+    return make_sheet(2000, **spec)
+
+def test_logic_aggregates():
+    df = logic_sheet()
+    assert_same(business_logic_7.calculate_aggregated_values(df), reference(df, business_logic_7.AGGREGATES))
+
+def test_summarize_prices_matches_pivot_table():
+    df = logic_sheet()
+    # pivot_and_average_prices as it ran on the text keys of unnormalized sheets
+    keys = ['site name', 'vendor', 'session', 'meal type', 'order type']
+    text_df = df.astype({key: object for key in keys})
+    pivot_df = text_df.pivot_table(index=keys, aggfunc='size').reset_index(name='days')
+    avg_prices = text_df.groupby(keys).agg(
+        average_buying_price_ai=('buying price ai', 'mean'),
+        average_selling_price=('selling price', 'mean')
+    ).reset_index()
+    expected = pivot_df.merge(avg_prices, on=keys)
+    pd.testing.assert_frame_equal(summarize_prices(df), expected, check_dtype=False, check_categorical=False)
@@ -0,0 +1,93 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+from incremental_audit import reaudit
+from sheets import SHEETS, make_sheet
+
+SIZE = 2000
+
+def full_audit(name, df):
+    return getattr(importlib.import_module(name), name)(df)
+
+def assert_same_result(result, expected):
+    if expected.average_prices is None:
+        assert result.average_prices is None
+    else:
+        pd.testing.assert_frame_equal(result.average_prices, expected.average_prices)
+    assert list(result.reports) == list(expected.reports)
+    for report, expected_df in expected.reports.items():
+        pd.testing.assert_frame_equal(result.reports[report], expected_df, check_dtype=False, obj=report)
+    assert result.aggregates == expected.aggregates
+
+# Columns each sheet holds text in and the numeric columns edited besides them. The aggregates
+# and average prices add their columns up, so those never hold text.
+EDITS = {
+    'business_logic_7': (['client dc cosumption', 'buying price'], ['selling amount', 'buying pax']),
+    'business_logic_18': (['actual consumption', 'buying price'], ['selling amount', 'buying pax']),
+    'business_logic_43': (['buying mg/pax', 'selling mg/pax', 'total sales'], ['buying price ai', 'total pax buying'])
+}
+
+def sheet(name):
+    text_columns, _ = EDITS[name]
+    return make_sheet(SIZE, seed=1, **{**SHEETS[name], 'text_columns': text_columns})
+
+def edit(df, name, seed):
+    # Rewrites 20 cells of each edited column with new numbers and blanks, and some text where
+    # the column holds text already
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    text_columns, numeric_columns = EDITS[name]
+    for column in text_columns + numeric_columns:
+        rows = rng.choice(df.index, 20, replace=False)
+        values = rng.choice([0.0, 12.5, 480.0, np.nan], len(rows))
+        if df[column].dtype == object:
+            values = values.astype(object)
+            values[::4] = 'na'
+        df.loc[rows, column] = values
+    return df
+
+def count_audited_rows(monkeypatch, module):
+    # The sizes of the sheets find_issues is called with from then on
+    find_issues = module.find_issues
+    audited = []
+    monkeypatch.setattr(module, 'find_issues', lambda df: audited.append(len(df)) or find_issues(df))
+    return audited
+
+@pytest.mark.parametrize('name', list(EDITS))
+def test_reaudit_matches_full_audit(name, monkeypatch):
+    module = importlib.import_module(name)
+    audited = count_audited_rows(monkeypatch, module)
+
+    def audit(df, state):
+        # The result, the next state and how many rows find_issues looked at
+        audited.clear()
+        result, state = reaudit(module, df, state)
+        rows = sum(audited)
+        assert_same_result(result, full_audit(name, df))
+        return state, rows
+
+    df = sheet(name)
+    state, rows = audit(df, None)
+    assert rows == SIZE
+
+    edited = edit(df, name, seed=2)
+    state, rows = audit(edited, state)
+    assert 0 < rows <= 20 * sum(map(len, EDITS[name]))
+
+    deleted = edited.drop(index=np.random.default_rng(3).choice(edited.index, 100, replace=False))
+    state, rows = audit(deleted, state)
+    assert rows == 0
+
+    state, rows = audit(edit(deleted, name, seed=4), state)
+    assert 0 < rows <= 20 * sum(map(len, EDITS[name]))
+
+def test_reaudit_after_column_change_is_full(monkeypatch):
+    module = importlib.import_module('business_logic_7')
+    df = sheet('business_logic_7')
+    _, state = reaudit(module, df)
+    audited = count_audited_rows(monkeypatch, module)
+    added = df.assign(remarks='checked')
+    result, _ = reaudit(module, added, state)
+    assert audited == [SIZE]
+    assert_same_result(result, full_audit('business_logic_7', added))
@@ -0,0 +1,124 @@
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+import row_loop
+from mismatch_engine import check, col, compile_rules, guard, run_plan, tiered, where
+from sheets import SHEETS, make_sheet
+
+SIZE = 3000
+
+def audit_sheet(name, seed=0):
+    # Half the rows are filled in from their formulas, so both matches and mismatches occur
+    df = make_sheet(SIZE, seed=seed, **SHEETS[name])
+    rows = np.random.default_rng(seed).choice(SIZE, SIZE // 2, replace=False)
+    return row_loop.fill(df, getattr(row_loop, name), sorted(rows))
+
+def check_errors(results):
+    row_errors = results['row_errors']
+    reports = [name for name in results if name not in ('mismatches', 'row_errors')]
+    return row_errors[~row_errors['Rule'].isin(reports)]
+
+@pytest.mark.parametrize('name', list(SHEETS))
+def test_run_plan_matches_row_loop(name):
+    df = audit_sheet(name)
+    expected, errors = row_loop.run_loop(df, getattr(row_loop, name))
+    module = importlib.import_module(name)
+    results = module.find_issues(df)
+
+    pd.testing.assert_frame_equal(results['mismatches'], expected, check_dtype=False)
+    row_errors = check_errors(results)
+    assert row_errors['Row'].is_unique
+    assert dict(zip(row_errors['Row'], row_errors['Error'])) == errors
+    # Filled rows match most of their checks, so the sheet exercises both outcomes
+    assert 0 < len(expected) < SIZE * len(module.AUDIT_PLAN.steps) * 3 // 4
+    assert 'Unsupported value' in errors.values()
+
+def test_guard_and_division_by_zero_errors():
+    _, errors = row_loop.run_loop(audit_sheet('business_logic_7'), row_loop.business_logic_7)
+    assert {'Unknown meal type', 'Division by zero', 'Unsupported value'} <= set(errors.values())
+
+def test_session_reports_match_row_loop():
+    df = audit_sheet('business_logic_18')
+    results = importlib.import_module('business_logic_18').find_issues(df)
+    for name, rows in row_loop.business_logic_18_reports(df).items():
+        assert results[name]['Row'].tolist() == rows
+        assert rows
+
+def test_tolerance():
+    # Money matches to the paisa and head counts to whole numbers, bounds included
+    df = pd.DataFrame({
+        'amount': [84.75, 84.76, 1.0],
+        'money': [84.7458, 84.7449, 1.0],
+        'selling pax': [10.4, 10.6, 10.5]
+    })
+    plan = compile_rules([check('amount', col('money')), check('selling pax', 10)])
+    assert run_plan(df, plan)['mismatches'][['Row', 'Column']].values.tolist() == [[4, 'amount'], [4, 'selling pax']]
+
+def test_division_by_zero_and_text_cells():
+    df = pd.DataFrame({
+        'a': [10.0, 'na', 5.0, 4.0, 0.0],
+        'b': [2.0, 2.0, 0.0, 'na', 0.0],
+        'x': [5.0, 1.0, 1.0, 1.0, 1.0],
+        'y': ['na', 0.0, 0.0, 0.0, 0.0]
+    })
+    results = run_plan(df, compile_rules([check('x', col('a') / col('b')), check('y', col('x') + 5)]))
+    assert results['row_errors'].values.tolist() == [
+        [4, 'x', 'Unsupported value'], [5, 'x', 'Division by zero'], [6, 'x', 'Unsupported value'], [7, 'x', 'Division by zero']
+    ]
+    # Rows that raised are skipped by later checks; text in the checked column is reported as is
+    assert results['mismatches'][['Row', 'Column', 'Expected', 'Actual']].values.tolist() == [[3, 'y', 10.0, 'na']]
+
+def test_guard_skips_later_checks():
+    df = pd.DataFrame({'meal type': ['buffet', 'jain', np.nan], 'x': [1.0, 1.0, 1.0]})
+    results = run_plan(df, compile_rules([guard(col('meal type').isin(['buffet']), 'meal type'), check('x', 2)]))
+    assert results['row_errors'].values.tolist() == [[4, 'meal type', 'Unknown meal type'], [5, 'meal type', 'Unknown meal type']]
+    assert results['mismatches']['Row'].tolist() == [3]
+
+def test_rows_fail_only_on_values_they_compute():
+    df = pd.DataFrame({
+        'session': ['lunch', 'dinner', 'lunch', 'dinner'],
+        'a': ['na', 'na', 1.0, 1.0],
+        'b': [1.0, 1.0, 'na', 'na'],
+        'x': [1.0, 1.0, 1.0, 1.0]
+    })
+    lunch = col('session') == 'lunch'
+    plan = compile_rules([check('x', col('a') * 1, when=~lunch), check('x', where(lunch, col('b') * 1, col('a') * 1))])
+    results = run_plan(df, plan)
+    assert results['row_errors'][['Row', 'Rule']].values.tolist() == [[4, 'x'], [5, 'x']]
+    assert results['mismatches'].empty
+
+def test_tiered():
+    df = pd.DataFrame({
+        'meal': ['veg', 'veg', 'veg', 'veg', 'veg', 'veg', 'jain', 'jain'],
+        'level': [500.0, 500.5, 900.0, 901.0, np.nan, 0.0, 100.0, 'na']
+    })
+    table = [('veg', (500, 900, np.inf), (49, 48, 47))]
+    results = run_plan(df, compile_rules([check('price', tiered('meal', table, col('level')))]))
+    # Text levels of meal types outside the table are never compared
+    assert results['row_errors'].empty
+    assert results['mismatches']['Expected'].fillna(-1).tolist() == [49, 48, 48, 47, 49, 49, -1, -1]
+
+def test_text_copied_as_is_is_a_mismatch():
+    # The row loop compared a copied text cell with != and went on checking the row
+    df = pd.DataFrame({
+        'meal': ['a', 'a', 'a', 'b'],
+        'source': ['na', 'na', 2.0, 'na'],
+        'x': [3.0, 'na', 2.0, 5.0],
+        'y': [999.0, 1.0, 4.0, 0.0]
+    })
+    plan = compile_rules([check('x', where(col('meal') == 'a', col('source'), 5)), check('y', col('x') * 2)])
+    results = run_plan(df, plan)
+    assert results['mismatches'][['Row', 'Column', 'Expected', 'Actual']].values.tolist() == [
+        [3, 'x', 'na', 3.0], [3, 'y', 6.0, 999.0], [6, 'y', 10.0, 0.0]
+    ]
+    assert results['row_errors'].values.tolist() == [[4, 'y', 'Unsupported value']]
+
+def test_text_pax_keeps_checking_the_row():
+    df = pd.DataFrame({
+        'date': [pd.Timestamp('2024-05-01')], 'ordered pax/vendor mg': ['na'], 'buying pax': [3.0], 'buying price ai': [2.0],
+        'gst': [1.0], 'buying price': [2.0], 'buying amt ai': [6.0], 'commission': [999.0]
+    })
+    results = importlib.import_module('business_logic_1').find_issues(df)
+    assert results['mismatches'][['Column', 'Expected', 'Actual']].values.tolist() == [['buying pax', 'na', 3.0], ['commission', -6.0, 999.0]]
+    assert results['row_errors'].empty
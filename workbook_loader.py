@@ -0,0 +1,297 @@
+import pandas as pd
+import numpy as np
+import io
+import os
+import json
+import shutil
+import logging
+import datetime
+import threading
+import contextlib
+import importlib.util
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Legacy .xls files are OLE2 compound documents
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+# Sidecar cache of decoded sheets, shared by every session on this machine
+CACHE_DIR = os.environ.get('MIS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mis_reviewer'))
+CACHE_MAX_BYTES = int(os.environ.get('MIS_CACHE_MAX_MB', '1024')) * 1024 * 1024
+
+def reader_engines(file_bytes):
+    # calamine reads both formats much faster; openpyxl/xlrd stay as the fallback
+    engines = []
+    if importlib.util.find_spec('python_calamine') is not None:
+        engines.append('calamine')
+    engines.append('xlrd' if file_bytes[:8] == XLS_SIGNATURE else 'openpyxl')
+    return engines
+
+# Cells of mixed columns and the column labels are stored as (type, text) pairs, so reading a
+# cache file written by another session only ever parses text and never runs code
+def _encode(value):
+    if value is None:
+        return 'none', ''
+    if value is pd.NaT:
+        return 'nat', ''
+    if isinstance(value, (bool, np.bool_)):
+        return 'bool', str(bool(value))
+    if isinstance(value, (int, np.integer)):
+        return 'int', str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return 'float', repr(float(value))
+    if isinstance(value, str):
+        return 'str', value
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return 'timestamp', pd.Timestamp(value).isoformat()
+    if isinstance(value, datetime.datetime):
+        return 'datetime', value.isoformat()
+    if isinstance(value, datetime.date):
+        return 'date', value.isoformat()
+    if isinstance(value, datetime.time):
+        return 'time', value.isoformat()
+    if isinstance(value, (datetime.timedelta, np.timedelta64)):
+        return 'timedelta', str(pd.Timedelta(value).value)
+    raise TypeError(f"Cannot cache a cell of type '{type(value).__name__}'")
+
+_DECODERS = {
+    'none': lambda text: None,
+    'nat': lambda text: pd.NaT,
+    'bool': lambda text: text == 'True',
+    'int': int,
+    'float': float,
+    'str': str,
+    'timestamp': pd.Timestamp,
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'time': datetime.time.fromisoformat,
+    'timedelta': lambda text: pd.Timedelta(int(text))
+}
+
+def _to_table(df):
+    # Columns are stored positionally and their real labels kept in the schema metadata, so
+    # duplicate or non-string headers survive. Object columns mixing text with numbers or dates
+    # (e.g. 'na' typed into a price column) have no Arrow type; each is stored as the text of its
+    # cells plus a column naming each cell's type.
+    columns = {}
+    mixed = []
+    for i, (name, series) in enumerate(df.items()):
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+            tags, texts = zip(*map(_encode, series)) if len(series) else ((), ())
+            columns[f'c{i}'] = pa.array(texts, type=pa.string())
+            columns[f'c{i}_type'] = pa.array(tags, type=pa.string()).dictionary_encode()
+            mixed.append(i)
+        else:
+            columns[f'c{i}'] = pa.array(series, from_pandas=True)
+    table = pa.table(columns)
+    return table.replace_schema_metadata({
+        'columns': json.dumps([_encode(name) for name in df.columns]),
+        'mixed': json.dumps(mixed)
+    })
+
+def _from_mixed(texts, tags):
+    # Cells are decoded one type at a time; text cells are taken as they are and numbers are
+    # parsed as a whole array
+    texts = texts.to_numpy(zero_copy_only=False).astype(object)
+    tags = tags.cast(pa.string()).to_numpy(zero_copy_only=False).astype(object)
+    values = np.empty(len(texts), dtype=object)
+    for tag in set(tags):
+        rows = tags == tag
+        if tag == 'str':
+            values[rows] = texts[rows]
+        elif tag == 'float':
+            values[rows] = texts[rows].astype(float)
+        else:
+            decode = _DECODERS[tag]
+            values[rows] = [decode(text) for text in texts[rows]]
+    return pd.Series(values, dtype=object)
+
+def _from_table(table):
+    metadata = table.schema.metadata
+    mixed = set(json.loads(metadata[b'mixed']))
+    data = {}
+    for i in range(len(json.loads(metadata[b'columns']))):
+        if i in mixed:
+            data[i] = _from_mixed(table.column(f'c{i}'), table.column(f'c{i}_type'))
+        else:
+            series = table.column(f'c{i}').to_pandas()
+            if series.dtype == object:
+                # Arrow hands back empty text cells as None where the Excel reader gave NaN
+                series = series.where(series.notna(), np.nan)
+            data[i] = series
+    df = pd.DataFrame(data)
+    df.columns = [_DECODERS[tag](text) for tag, text in json.loads(metadata[b'columns'])]
+    return df
+
+def _file_size(entry):
+    try:
+        return entry.stat().st_size if entry.is_file() else 0
+    except OSError:
+        # A temporary file renamed into place by a concurrent write
+        return 0
+
+class SheetCache:
+    # <directory>/<file hash>/sheets.json lists the sheet names; sheet N is stored in N.parquet.
+    # Whole workbooks are evicted least recently used first once the cache outgrows max_bytes.
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _workbook_dir(self, file_hash):
+        return os.path.join(self.directory, file_hash)
+
+    def _touch(self, file_hash):
+        try:
+            os.utime(self._workbook_dir(file_hash))
+        except OSError:
+            pass
+
+    def _write_file(self, path, write):
+        # Write to a temporary file first so other sessions never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def sheet_names(self, file_hash):
+        try:
+            with open(os.path.join(self._workbook_dir(file_hash), 'sheets.json'), encoding='utf-8') as f:
+                sheet_names = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._touch(file_hash)
+        return sheet_names
+
+    def save_sheet_names(self, file_hash, sheet_names):
+        def write(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(sheet_names, f)
+        try:
+            self._write_file(os.path.join(self._workbook_dir(file_hash), 'sheets.json'), write)
+        except OSError as e:
+            logging.warning(f"Could not cache the sheet names: {e}")
+
+    def read(self, file_hash, sheet_index):
+        path = os.path.join(self._workbook_dir(file_hash), f'{sheet_index}.parquet')
+        if not os.path.exists(path):
+            return None
+        try:
+            df = _from_table(pq.read_table(path, memory_map=True))
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cached sheet '{path}': {e}")
+            # Another session may have evicted the workbook in the meantime
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        self._touch(file_hash)
+        return df
+
+    def write(self, file_hash, sheet_index, df):
+        path = os.path.join(self._workbook_dir(file_hash), f'{sheet_index}.parquet')
+        try:
+            table = _to_table(df)
+            self._write_file(path, lambda temp_path: pq.write_table(table, temp_path))
+        except Exception as e:
+            logging.warning(f"Could not cache sheet {sheet_index}: {e}")
+            return
+        self._touch(file_hash)
+        try:
+            self.evict()
+        except OSError as e:
+            logging.warning(f"Could not evict cached workbooks: {e}")
+
+    def evict(self):
+        workbooks = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_dir():
+                    continue
+                size = sum(_file_size(f) for f in os.scandir(entry.path))
+                workbooks.append((entry.stat().st_mtime, size, entry.path))
+            except OSError:
+                # Another session evicted this workbook while it was being measured
+                continue
+            total += size
+        # Keep the most recently used workbook even if it alone is over the cap
+        for _, size, path in sorted(workbooks)[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted cached workbook '{os.path.basename(path)}'.")
+
+# An uploaded workbook, opened at most once. Sheet names come from the open handle and
+# only the sheets that are asked for get decoded. With a SheetCache, sheets decoded by any
+# earlier session are read back from Parquet and the workbook is not opened at all.
+class Workbook:
+    def __init__(self, file_bytes, engines=None, file_hash=None, cache=None):
+        self._file_bytes = file_bytes
+        self._engines = list(engines or reader_engines(file_bytes))
+        self._excel_file = None
+        self._sheet_names = None
+        self._file_hash = file_hash
+        self._cache = cache if file_hash else None
+        self._lock = threading.Lock()
+
+    def _fall_back(self, error):
+        # Drop the failing engine and let the next one reopen the workbook
+        if len(self._engines) == 1:
+            raise error
+        logging.warning(f"Reading with the '{self._engines[0]}' engine failed ({error}), falling back to '{self._engines[1]}'.")
+        self._engines.pop(0)
+        self._excel_file = None
+
+    @property
+    def engine(self):
+        return self._engines[0]
+
+    @property
+    def excel_file(self):
+        while self._excel_file is None:
+            try:
+                self._excel_file = pd.ExcelFile(io.BytesIO(self._file_bytes), engine=self.engine)
+                logging.info(f"Workbook opened with the '{self.engine}' engine.")
+            except Exception as e:
+                self._fall_back(e)
+        return self._excel_file
+
+    def _load_sheet_names(self):
+        if self._sheet_names is None and self._cache:
+            self._sheet_names = self._cache.sheet_names(self._file_hash)
+        if self._sheet_names is None:
+            self._sheet_names = self.excel_file.sheet_names
+            if self._cache:
+                self._cache.save_sheet_names(self._file_hash, self._sheet_names)
+        return self._sheet_names
+
+    @property
+    def sheet_names(self):
+        with self._lock:
+            return list(self._load_sheet_names())
+
+    def _parse(self, sheet_name):
+        while True:
+            try:
+                return self.excel_file.parse(sheet_name, header=1)
+            except ValueError:
+                # Missing sheets and bad headers fail the same way on every engine
+                raise
+            except Exception as e:
+                self._fall_back(e)
+
+    def read_sheet(self, sheet_name):
+        # The handle is shared between sessions, and the readers are not safe to use concurrently
+        with self._lock:
+            if not self._cache or sheet_name not in self._load_sheet_names():
+                return self._parse(sheet_name)
+            sheet_index = self._sheet_names.index(sheet_name)
+            df = self._cache.read(self._file_hash, sheet_index)
+            if df is None:
+                df = self._parse(sheet_name)
+                self._cache.write(self._file_hash, sheet_index, df)
+            return df